@@ -3,37 +3,56 @@ Mini RAG - FastAPI Backend
 ═══════════════════════════════════════════════════════════════════════════════
 
 Endpoints:
-- POST /ingest    - Ingest text into vector store
-- POST /upload    - Upload and ingest file (PDF, DOCX, TXT)
+- POST /ingest    - Ingest text into vector store (?background=true → 202 + job)
+- POST /upload    - Upload and ingest file (PDF, DOCX, TXT) (?background=true → 202 + job)
+- GET  /jobs/{job_id} - Background ingest job status
 - POST /query     - Query with RAG pipeline
-- GET  /documents - List all documents
+- POST /query/stream - Same, as server-sent events (sources, tokens, done)
+- POST /query/batch  - Many questions at once, NDJSON results in completion order
+- GET  /documents - List documents (cursor-paginated)
 - DELETE /documents/{doc_id} - Delete a document
 - GET  /health    - Health check
+- GET  /stats     - Cache statistics
+- POST /warmup    - Initialize Cohere and vector store connections after a cold start
+- GET  /debug/env - Which API keys are configured (values hidden)
+- GET  /          - API info
 
 CORS & OPTIONS:
 - CORSMiddleware is added FIRST (before any routes)
 - OPTIONS requests are handled automatically by the middleware
 - This prevents 502 errors on preflight requests
+
+Concurrency:
+- Handlers never block the event loop: blocking SDK calls (Pinecone,
+  Cohere, extraction) run in a worker thread pool, Groq uses its async
+  client. With --workers 1, a slow LLM call no longer stalls /health.
 """
 
+import asyncio
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, UploadFile, File, Request
+from typing import Optional
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 
 from .schemas import (
     IngestRequest, IngestResponse,
-    QueryRequest, QueryResponse, Source,
+    QueryRequest, QueryResponse, Source, BatchQueryRequest,
     DocumentInfo, DeleteResponse,
-    HealthResponse, UploadResponse
+    HealthResponse, UploadResponse, JobInfo
 )
 
 # Load environment variables FIRST
 load_dotenv()
 
+# Threads for offloaded blocking calls (mostly waiting on network I/O)
+IO_THREADS = int(os.getenv("IO_THREADS", "32"))
+
 
 # ═══════════════════════════════════════════════════════════════════════════
 # APP SETUP - CORS MUST BE CONFIGURED IMMEDIATELY
@@ -45,9 +64,34 @@ async def lifespan(app: FastAPI):
     # NOTE: Model loading is LAZY (on first actual request)
     # This allows Render free tier (512MB) to boot fast
     # OPTIONS requests will NOT trigger model loading
+    # asyncio.to_thread() uses the default executor; size it for I/O waits
+    # rather than CPU count (Render free tier has 1 CPU → only 5 threads).
+    executor = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="io")
+    asyncio.get_running_loop().set_default_executor(executor)
+    
+    # Background ingest jobs a restart left unfinished: resume or mark them
+    from .services.jobs import recover_jobs, shutdown_jobs
+    await asyncio.to_thread(recover_jobs)
+    
+    # DATA_DIR is ephemeral on Render: rebuild the document registry from
+    # the vector index if a restart wiped it
+    from .services.vector_store import ensure_registry
+    try:
+        await asyncio.to_thread(ensure_registry)
+    except Exception as e:
+        print(f"⚠️ Document registry backfill skipped: {e}")
+    # Same for the BM25 index (hybrid search would silently go dense-only)
+    from .services.retriever import rebuild_lexical_index
+    try:
+        await asyncio.to_thread(rebuild_lexical_index)
+    except Exception as e:
+        print(f"⚠️ BM25 index rebuild skipped, lexical search is empty: {e}")
+    
     print("✅ App started (models will load on first POST request)...")
     yield
     print("Shutting down.")
+    shutdown_jobs()
+    executor.shutdown(wait=False)
 
 
 # Create app with minimal startup
@@ -105,6 +149,24 @@ async def debug_env():
         "GROQ_API_KEY": "✅ Set" if os.getenv("GROQ_API_KEY") else "❌ Missing",
         "COHERE_API_KEY": "✅ Set" if os.getenv("COHERE_API_KEY") else "❌ Missing",
         "PINECONE_INDEX_NAME": os.getenv("PINECONE_INDEX_NAME", "mini-rag (default)"),
+        "VECTOR_BACKEND": os.getenv("VECTOR_BACKEND", "pinecone (default)"),
+    }
+
+
+@app.get("/stats", tags=["Health"])
+async def stats():
+    """Cache hit/miss counters."""
+    from .services.embedder import get_cache_stats, get_batcher_stats
+    from .services.reranker import get_cache_stats as get_rerank_cache_stats
+    from .services.pipeline import get_answer_cache_stats
+    from .services.semantic_cache import get_semantic_cache_stats
+    
+    return {
+        "embedding_cache": get_cache_stats(),
+        "rerank_cache": get_rerank_cache_stats(),
+        "answer_cache": get_answer_cache_stats(),
+        "semantic_cache": get_semantic_cache_stats(),
+        "query_batcher": get_batcher_stats()
     }
 
 
@@ -121,11 +183,11 @@ async def warmup():
         get_client()
         print("✅ Cohere client ready")
         
-        # Test Pinecone connection
-        from .services.vector_store import get_index
-        print("Connecting to Pinecone...")
-        get_index()
-        print("✅ Pinecone connected")
+        # Test Pinecone connection (or load the local index)
+        from .services.vector_store import get_index, VECTOR_BACKEND
+        print(f"Connecting to vector store ({VECTOR_BACKEND})...")
+        await asyncio.to_thread(get_index)
+        print("✅ Vector store connected")
         
         return {"status": "ready", "message": "Services initialized and ready"}
     except Exception as e:
@@ -135,36 +197,77 @@ async def warmup():
         )
 
 
-@app.post("/ingest", response_model=IngestResponse, tags=["Ingest"])
-async def ingest_document(request: IngestRequest):
+def _queue_job(kind: str, params: dict, payload: bytes) -> JSONResponse:
+    """Submit a background ingest job; 202 with its JobInfo."""
+    from .services.jobs import JobQueueFull, submit_job
+    
+    try:
+        job = submit_job(kind, params, payload)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return JSONResponse(status_code=202, content=job.to_dict())
+
+
+@app.post(
+    "/ingest",
+    response_model=IngestResponse,
+    responses={202: {"model": JobInfo, "description": "Queued as a background job"}},
+    tags=["Ingest"]
+)
+async def ingest_document(
+    request: IngestRequest,
+    background: bool = Query(False, description="Queue as a job; poll GET /jobs/{job_id}")
+):
     """
     Ingest text into the RAG system.
     
     - Chunks text with token-based splitting (1000 tokens, 120 overlap)
     - Embeds chunks using Cohere API
     - Stores in Pinecone vector database
+    
+    With background=true, returns 202 and a job (see GET /jobs/{job_id}).
     """
     # Check required env vars BEFORE importing heavy modules
-    if not os.getenv("PINECONE_API_KEY"):
+    uses_pinecone = os.getenv("VECTOR_BACKEND", "pinecone").lower() == "pinecone"
+    if uses_pinecone and not os.getenv("PINECONE_API_KEY"):
         raise HTTPException(status_code=500, detail="PINECONE_API_KEY not configured")
     
     try:
+        if background:
+            return await asyncio.to_thread(
+                _queue_job,
+                "ingest",
+                {"doc_id": request.doc_id, "metadata": request.metadata or {}},
+                request.text.encode("utf-8")
+            )
+        
         from .services.pipeline import ingest_text
         
-        result = ingest_text(
+        result = await asyncio.to_thread(
+            ingest_text,
             text=request.text,
             doc_id=request.doc_id,
             metadata=request.metadata or {}
         )
         return IngestResponse(**result)
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         print(f"Ingest error: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/upload", response_model=UploadResponse, tags=["Ingest"])
-async def upload_file(file: UploadFile = File(...)):
+@app.post(
+    "/upload",
+    response_model=UploadResponse,
+    responses={202: {"model": JobInfo, "description": "Queued as a background job"}},
+    tags=["Ingest"]
+)
+async def upload_file(
+    file: UploadFile = File(...),
+    background: bool = Query(False, description="Queue as a job; poll GET /jobs/{job_id}")
+):
     """
     Upload and ingest a file into the RAG system.
     
@@ -173,12 +276,15 @@ async def upload_file(file: UploadFile = File(...)):
     
     The file is:
     1. Validated (type & size)
-    2. Text extracted
-    3. Chunked, embedded, and stored (reuses existing pipeline)
+    2. Text extracted (streamed page-by-page)
+    3. Chunked, embedded, and stored in overlapping pipelined stages
+    
+    With background=true, steps 2-3 run as a job: returns 202 and the job
+    right after validation (see GET /jobs/{job_id}).
     """
-    from .services.pipeline import ingest_text
+    from .services.pipeline import ingest_stream
     from .services.file_extractor import (
-        extract_text, validate_file,
+        iter_text, validate_file,
         FileExtractionError, UnsupportedFileTypeError, FileTooLargeError
     )
     
@@ -192,19 +298,6 @@ async def upload_file(file: UploadFile = File(...)):
         # Validate file type and size
         file_ext = validate_file(filename, file_size)
         
-        # Extract text from file
-        text = extract_text(filename, content)
-        
-        if not text.strip():
-            return UploadResponse(
-                doc_id="",
-                filename=filename,
-                file_type=file_ext,
-                chunks_created=0,
-                status="error",
-                message="No text content found in file"
-            )
-        
         # Generate doc_id from filename (sanitized)
         doc_id = Path(filename).stem.lower()
         doc_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in doc_id)
@@ -219,13 +312,33 @@ async def upload_file(file: UploadFile = File(...)):
             "file_size_bytes": file_size
         }
         
-        # Reuse existing ingest pipeline
-        result = ingest_text(
-            text=text,
+        if background:
+            return await asyncio.to_thread(
+                _queue_job,
+                "upload",
+                {"doc_id": doc_id, "filename": filename, "metadata": metadata},
+                content
+            )
+        
+        # Stream extracted text straight into the ingest pipeline
+        # (extract → chunk → embed → store, without holding the full text)
+        result = await asyncio.to_thread(
+            ingest_stream,
+            iter_text(filename, content),
             doc_id=doc_id,
             metadata=metadata
         )
         
+        if result["status"] == "empty_text":
+            return UploadResponse(
+                doc_id="",
+                filename=filename,
+                file_type=file_ext,
+                chunks_created=0,
+                status="error",
+                message="No text content found in file"
+            )
+        
         return UploadResponse(
             doc_id=result["doc_id"],
             filename=filename,
@@ -244,10 +357,24 @@ async def upload_file(file: UploadFile = File(...)):
     except FileExtractionError as e:
         raise HTTPException(status_code=422, detail=str(e))
     
+    except HTTPException:
+        raise
+    
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 
+@app.get("/jobs/{job_id}", response_model=JobInfo, tags=["Ingest"])
+async def get_job_status(job_id: str):
+    """Stage, chunks processed and error of a background ingest job."""
+    from .services.jobs import get_job
+    
+    job = await asyncio.to_thread(get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return JobInfo(**job.to_dict())
+
+
 @app.post("/query", response_model=QueryResponse, tags=["Query"])
 async def query_documents(request: QueryRequest):
     """
@@ -260,10 +387,11 @@ async def query_documents(request: QueryRequest):
     4. Generate answer with Groq LLM
     5. Return answer with inline citations
     """
-    from .services.pipeline import rag_pipeline
+    from .services.pipeline import rag_pipeline_async
     
     try:
-        result = rag_pipeline(
+        # Query embedding is coalesced with concurrent queries
+        result = await rag_pipeline_async(
             query=request.question,
             retrieve_k=20,
             rerank_k=request.top_k,
@@ -275,6 +403,7 @@ async def query_documents(request: QueryRequest):
             Source(
                 index=src["index"],
                 chunk_id=src["chunk_id"],
+                chunk_ids=src.get("chunk_ids", [src["chunk_id"]]),
                 doc_id=src["doc_id"],
                 text=src["text"],
                 score=src["score"],
@@ -291,39 +420,130 @@ async def query_documents(request: QueryRequest):
             has_answer=result.has_answer,
             tokens_used=result.tokens_used,
             retrieval_count=result.retrieval_count,
-            rerank_count=result.rerank_count
+            rerank_count=result.rerank_count,
+            context_tokens=result.context_tokens,
+            dropped_chunks=result.dropped_chunks
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _sse(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/query/stream", tags=["Query"])
+async def query_documents_stream(request: QueryRequest):
+    """
+    Query the RAG system, streaming the response as server-sent events.
+    
+    Events:
+    - sources: reranked sources, sent as soon as reranking finishes
+    - token:   answer text deltas as the LLM produces them
+    - done:    full answer, has_answer, tokens_used
+    - error:   detail, if the pipeline fails mid-stream
+    """
+    from .services.pipeline import rag_pipeline_stream
+    
+    async def events():
+        try:
+            async for event, data in rag_pipeline_stream(
+                query=request.question,
+                retrieve_k=20,
+                rerank_k=request.top_k,
+                doc_id=request.doc_id
+            ):
+                yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/query/batch", tags=["Query"])
+async def query_documents_batch(request: BatchQueryRequest):
+    """
+    Answer many questions in one request, streamed back as NDJSON.
+    
+    One line per question, in completion order (not request order):
+    {"index", "question", "elapsed_s", "answer", "sources", ...} or
+    {"index", "question", "error"}. Questions share one embedding call;
+    retrieval runs concurrently, reranking under a concurrency cap and
+    generation under the Groq rate limit.
+    """
+    from .services.batch import BATCH_MAX_QUESTIONS, rag_batch
+    
+    questions = [q.strip() for q in request.questions]
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many questions (max {BATCH_MAX_QUESTIONS} per batch)"
+        )
+    if not all(questions):
+        raise HTTPException(status_code=400, detail="Questions must not be empty")
+    
+    async def lines():
+        try:
+            async for record in rag_batch(
+                questions,
+                rerank_k=request.top_k,
+                doc_id=request.doc_id
+            ):
+                yield json.dumps(record) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @app.get("/documents", response_model=list[DocumentInfo], tags=["Documents"])
-async def list_documents():
-    """List all ingested documents."""
-    from .services.vector_store import list_documents
+async def list_documents(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None
+):
+    """
+    List ingested documents, newest first.
+    
+    Paginated: pass the X-Next-Cursor response header back as `cursor`
+    to get the next page (header is absent on the last page).
+    """
+    from .services.vector_store import list_documents_page
     
     try:
-        docs = list_documents()
-        return [
-            DocumentInfo(
-                doc_id=doc["doc_id"],
-                title=doc.get("title"),
-                chunk_count=doc.get("total_chunks", 0),
-                created_at=doc.get("created_at")
-            )
-            for doc in docs
-        ]
+        docs, next_cursor = await asyncio.to_thread(list_documents_page, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    return [
+        DocumentInfo(
+            doc_id=doc["doc_id"],
+            title=doc.get("title"),
+            chunk_count=doc.get("total_chunks", 0),
+            created_at=doc.get("created_at"),
+            byte_size=doc.get("byte_size")
+        )
+        for doc in docs
+    ]
 
 
 @app.delete("/documents/{doc_id}", response_model=DeleteResponse, tags=["Documents"])
 async def delete_document(doc_id: str):
     """Delete a document and all its chunks."""
-    from .services.vector_store import delete_document
+    from .services.pipeline import delete_document
     
     try:
-        result = delete_document(doc_id)
+        result = await asyncio.to_thread(delete_document, doc_id)
         return DeleteResponse(doc_id=result["deleted_doc_id"], status=result["status"])
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
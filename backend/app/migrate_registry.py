@@ -0,0 +1,37 @@
+"""
+Seed the document registry from the vector index.
+
+The API runs this automatically at startup when the registry is empty but
+the index is not; run it by hand to pick up documents missing from a
+non-empty registry. Documents already registered are left untouched, so
+re-running it is harmless.
+
+Usage (from backend/):
+    python -m app.migrate_registry
+    python -m app.migrate_registry --doc-id doc_abc123 --doc-id doc_def456
+"""
+
+import argparse
+
+from dotenv import load_dotenv
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--doc-id",
+        action="append",
+        dest="doc_ids",
+        help="Only migrate this document (repeatable); default: every document in the index"
+    )
+    args = parser.parse_args()
+    
+    # .env first: the services read their settings at import time
+    load_dotenv()
+    from app.services.vector_store import backfill_registry
+    
+    backfill_registry(args.doc_ids)
+
+
+if __name__ == "__main__":
+    main()
@@ -33,6 +33,19 @@ class IngestResponse(BaseModel):
     status: str  # "success" | "empty_text" | "error"
 
 
+class JobInfo(BaseModel):
+    """Status of a background ingest job."""
+    job_id: str
+    kind: str                                   # "ingest" | "upload"
+    stage: str                                  # queued | ingesting | done | failed | interrupted
+    chunks_processed: int = 0
+    doc_id: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[dict] = None
+    created_at: str
+    updated_at: str
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 # QUERY
 # ═══════════════════════════════════════════════════════════════════════════
@@ -51,10 +64,25 @@ class QueryRequest(BaseModel):
     }}
 
 
+class BatchQueryRequest(BaseModel):
+    """Many questions answered in one request (streamed back as NDJSON)."""
+    questions: list[str] = Field(..., min_length=1, description="Natural language questions")
+    top_k: int = Field(5, ge=1, le=20, description="Number of sources per answer")
+    doc_id: Optional[str] = Field(None, description="Filter to specific document")
+
+    model_config = {"json_schema_extra": {
+        "example": {
+            "questions": ["What causes climate change?", "How do solar panels work?"],
+            "top_k": 5
+        }
+    }}
+
+
 class Source(BaseModel):
     """A source chunk used in the answer."""
     index: int
     chunk_id: str
+    chunk_ids: list[str] = Field(default_factory=list)  # All chunks in a merged span
     doc_id: str
     text: str
     score: float
@@ -71,6 +99,8 @@ class QueryResponse(BaseModel):
     tokens_used: int
     retrieval_count: int
     rerank_count: int
+    context_tokens: int = 0                                   # Estimated prompt tokens
+    dropped_chunks: list[str] = Field(default_factory=list)   # Left out by the token budget
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -83,6 +113,7 @@ class DocumentInfo(BaseModel):
     title: Optional[str] = None
     chunk_count: int = 0
     created_at: Optional[str] = None
+    byte_size: Optional[int] = None
 
 
 class DeleteResponse(BaseModel):
@@ -16,20 +16,20 @@ __all__ = [
 def __getattr__(name):
     """Lazy import for heavy modules to reduce startup memory."""
     # Chunker
-    if name in ("chunk_text", "get_chunker", "TokenChunker", "Chunk"):
+    if name in ("chunk_text", "iter_chunks", "get_chunker", "TokenChunker", "Chunk"):
         from . import chunker
         return getattr(chunker, name)
     # Embedder
-    if name in ("embed_text", "embed_texts"):
+    if name in ("embed_text", "embed_texts", "embed_query", "embed_query_async"):
         from . import embedder
         return getattr(embedder, name)
     # Vector store
-    if name in ("upsert_chunks", "query_similar", "delete_document", 
-                "list_documents", "get_index_stats"):
+    if name in ("upsert_chunks", "query_similar", "delete_document", "delete_chunks",
+                "list_documents", "list_documents_page", "get_index_stats"):
         from . import vector_store
         return getattr(vector_store, name)
     # Retriever
-    if name in ("retrieve", "retrieve_as_context", "RetrievedChunk"):
+    if name in ("retrieve", "retrieve_as_context", "chunks_from_matches", "RetrievedChunk"):
         from . import retriever
         return getattr(retriever, name)
     # Reranker
@@ -37,11 +37,13 @@ def __getattr__(name):
         from . import reranker
         return getattr(reranker, name)
     # LLM
-    if name in ("generate_answer", "answer_question", "AnswerResponse", "Citation"):
+    if name in ("generate_answer", "generate_answer_async", "answer_question",
+                "AnswerResponse", "Citation"):
         from . import llm
         return getattr(llm, name)
     # Pipeline
-    if name in ("rag_pipeline", "ingest_text", "RAGResult"):
+    if name in ("rag_pipeline", "rag_pipeline_async", "ingest_text", "ingest_stream",
+                "RAGResult"):
         from . import pipeline
         return getattr(pipeline, name)
     
@@ -0,0 +1,93 @@
+"""
+Batch querying: many questions through the RAG pipeline at once.
+
+Why:
+- Evaluation and back-office jobs send hundreds of questions one /query
+  request at a time, so job time is the sum of per-request latencies
+- Run as one job, each stage overlaps across questions: total time is set
+  by the slowest stage's throughput (usually the Groq rate limit)
+
+Stages:
+1. Embed: every question in one embed_queries call (cache-aware, split
+   into provider-sized batches of 96 and sent concurrently)
+2. Retrieve: vector + BM25 searches for up to BATCH_CONCURRENCY questions
+   at a time
+3. Rerank: at most BATCH_RERANK_CONCURRENCY Cohere calls in flight
+4. Generate: LLM requests paced by the process-wide Groq rate limiter
+   (GROQ_RPM), which /query and /query/stream also go through; answer and
+   semantic cache hits skip it
+
+Results are yielded in completion order, each tagged with the question's
+index; one failing question yields an error record, not a failed batch.
+"""
+
+from __future__ import annotations
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Optional
+
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "16"))
+BATCH_RERANK_CONCURRENCY = int(os.getenv("BATCH_RERANK_CONCURRENCY", "4"))
+
+
+async def rag_batch(
+    questions: list[str],
+    rerank_k: int = 5,
+    doc_id: Optional[str] = None,
+    retrieve_k: int = 20
+) -> AsyncIterator[dict]:
+    """
+    Answer many questions, yielding result dicts as each one completes.
+
+    Each dict is {"index", "question", "elapsed_s", **RAGResult.to_dict()}
+    or {"index", "question", "error"}.
+
+    Example:
+        async for record in rag_batch(["What is X?", "Who made Y?"]):
+            print(record["index"], record.get("answer"))
+    """
+    from .embedder import embed_queries
+    from .pipeline import rag_pipeline_async
+
+    if not questions:
+        return
+
+    # STAGE 1: EMBED (all questions, one call)
+    embeddings = await asyncio.to_thread(embed_queries, questions)
+
+    in_flight = asyncio.Semaphore(max(BATCH_CONCURRENCY, 1))
+    rerank_slots = asyncio.Semaphore(max(BATCH_RERANK_CONCURRENCY, 1))
+
+    async def answer(index: int) -> dict:
+        question = questions[index]
+        async with in_flight:
+            started = time.perf_counter()
+            try:
+                # STAGES 2-4: retrieve, rerank (capped), generate (rate limited in llm.py)
+                result = await rag_pipeline_async(
+                    query=question,
+                    retrieve_k=retrieve_k,
+                    rerank_k=rerank_k,
+                    doc_id=doc_id,
+                    query_embedding=embeddings[index],
+                    rerank_slots=rerank_slots
+                )
+            except Exception as e:
+                return {"index": index, "question": question, "error": str(e)}
+            return {
+                "index": index,
+                "question": question,
+                "elapsed_s": round(time.perf_counter() - started, 3),
+                **result.to_dict()
+            }
+
+    tasks = [asyncio.create_task(answer(i)) for i in range(len(questions))]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away mid-stream: stop the remaining questions
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,365 @@
+"""
+Local BM25 inverted index over chunk text (lexical half of hybrid search).
+
+Why:
+- Dense embeddings blur exact identifiers: error codes, SKUs, function
+  names and version strings. A lexical index finds them by the token
+- Fused with dense results (retriever.fuse_matches) before reranking
+
+Tokens:
+- Lowercased runs of letters/digits, keeping joined identifiers whole
+  ("err_conn_42", "v2.3.1", "0x80070005") and also indexing their parts
+- Small English stopword list dropped (they carry no BM25 weight anyway)
+
+Postings (compressed):
+- One bytearray per term of varint pairs (row delta, term frequency);
+  rows only grow, so deltas are small and most pairs fit in 2 bytes
+- Appending a chunk appends to its terms' postings: indexing is incremental
+- Decoding is vectorized (NumPy), so scoring a term costs a few array ops
+  regardless of its posting length
+
+Deletes:
+- Rows are tombstoned and masked at query time (a per-row live flag), so
+  both scores and document frequencies count live rows only; compact()
+  rewrites the postings once tombstones outnumber live rows
+- Re-adding a chunk_id tombstones the previous row (so add_many checks
+  for compaction too)
+
+Persistence:
+- Single .npz (postings blob + offsets + row arrays), written by flush()
+  at the end of each ingest/delete rather than on every batch
+- Lives under DATA_DIR, which is ephemeral on Render's free tier. On
+  startup an empty index over a non-empty vector index is rebuilt from the
+  stored chunk text (retriever.rebuild_lexical_index); until that finishes,
+  or for chunks with no stored text, hybrid search is dense-only
+
+See benchmarks/bench_bm25.py for index size and lookup latency.
+"""
+
+from __future__ import annotations
+import json
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+DATA_DIR = os.getenv("DATA_DIR", "data")
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", os.path.join(DATA_DIR, "bm25.npz"))
+
+# Standard BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Compact once tombstones outnumber live rows (and there are enough to matter)
+COMPACT_MIN_TOMBSTONES = 1000
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[._\-:/][a-z0-9]+)*")
+_PART_RE = re.compile(r"[._\-:/]")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i if in into is it "
+    "its of on or our she so than that the their them then there these they this "
+    "to was we were what when where which who will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase tokens; joined identifiers are kept whole and split into parts."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if _PART_RE.search(token):
+            tokens.extend(p for p in _PART_RE.split(token) if p and p not in STOPWORDS)
+    return tokens
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# VARINT CODEC
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _append_varint(buf: bytearray, value: int) -> None:
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _decode_varints(data: bytes) -> np.ndarray:
+    """Decode a whole varint stream at once (LEB128, little-endian groups)."""
+    b = np.frombuffer(data, dtype=np.uint8)
+    if not (b >= 0x80).any():
+        return b.astype(np.int64)    # Fast path: every value < 128
+    ends = np.flatnonzero(b < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    group = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shifts = (np.arange(len(b)) - starts[group]) * 7
+    values = (b & 0x7F).astype(np.int64) << shifts
+    return np.add.reduceat(values, starts)
+
+
+def _decode_postings(data: bytes) -> tuple[np.ndarray, np.ndarray]:
+    """(rows, term frequencies) from a (delta, tf) varint stream."""
+    values = _decode_varints(data)
+    return np.cumsum(values[0::2]), values[1::2]
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# INDEX
+# ═══════════════════════════════════════════════════════════════════════════
+
+class BM25Index:
+    """Incremental BM25 index over chunk IDs with compressed postings."""
+
+    def __init__(self, path: Optional[str] = BM25_INDEX_PATH, k1: float = BM25_K1, b: float = BM25_B):
+        self.path = Path(path) if path else None
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._reset()
+        self._load()
+
+    def _reset(self) -> None:
+        self._postings: dict[str, bytearray] = {}
+        self._last_row: dict[str, int] = {}          # term → last row appended
+        self._chunk_ids: list[str] = []               # row → chunk_id
+        self._doc_ids: list[str] = []                 # row → doc_id
+        self._lengths = array("I")                    # row → token count
+        self._alive = bytearray()                     # row → 1 live / 0 tombstoned
+        self._rows: dict[str, int] = {}               # live chunk_id → row
+        self._doc_rows: dict[str, set[int]] = {}      # doc_id → live rows
+        self._dead: set[int] = set()
+        self._live_tokens = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def size_bytes(self) -> int:
+        """Compressed postings size."""
+        return sum(len(p) for p in self._postings.values())
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Writes
+    # ─────────────────────────────────────────────────────────────────────
+
+    def _append_row(self, chunk_id: str, doc_id: str, tokens: list[str]) -> None:
+        row = len(self._chunk_ids)
+        for term, tf in Counter(tokens).items():
+            buf = self._postings.get(term)
+            if buf is None:
+                buf = self._postings[term] = bytearray()
+            _append_varint(buf, row - self._last_row.get(term, 0))
+            _append_varint(buf, tf)
+            self._last_row[term] = row
+        self._chunk_ids.append(chunk_id)
+        self._doc_ids.append(doc_id)
+        self._lengths.append(len(tokens))
+        self._alive.append(1)
+        self._rows[chunk_id] = row
+        self._doc_rows.setdefault(doc_id, set()).add(row)
+        self._live_tokens += len(tokens)
+
+    def _remove_row(self, row: int) -> None:
+        self._dead.add(row)
+        self._alive[row] = 0
+        self._rows.pop(self._chunk_ids[row], None)
+        self._doc_rows.get(self._doc_ids[row], set()).discard(row)
+        self._live_tokens -= self._lengths[row]
+
+    def add_many(self, rows: Iterable[tuple[str, str, str]]) -> None:
+        """Index (chunk_id, doc_id, text) rows; re-adding a chunk_id replaces it."""
+        tokenized = [(cid, did, tokenize(text)) for cid, did, text in rows]
+        with self._lock:
+            for chunk_id, doc_id, tokens in tokenized:
+                old = self._rows.get(chunk_id)
+                if old is not None:
+                    self._remove_row(old)
+                self._append_row(chunk_id, doc_id, tokens)
+            self._dirty = True
+            self._maybe_compact()    # Re-ingests tombstone the old rows
+
+    def delete_ids(self, chunk_ids: Iterable[str]) -> None:
+        with self._lock:
+            for chunk_id in chunk_ids:
+                row = self._rows.get(chunk_id)
+                if row is not None:
+                    self._remove_row(row)
+                    self._dirty = True
+            self._maybe_compact()
+
+    def delete_document(self, doc_id: str) -> None:
+        with self._lock:
+            for row in list(self._doc_rows.pop(doc_id, ())):
+                self._remove_row(row)
+                self._dirty = True
+            self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        if len(self._dead) >= COMPACT_MIN_TOMBSTONES and len(self._dead) > len(self._rows):
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite postings without tombstoned rows (renumbers rows)."""
+        with self._lock:
+            if not self._dead:
+                return
+            live = np.array(sorted(self._rows.values()), dtype=np.int64)
+            remap = np.full(len(self._chunk_ids), -1, dtype=np.int64)
+            remap[live] = np.arange(len(live))
+
+            postings: dict[str, bytearray] = {}
+            last_row: dict[str, int] = {}
+            for term, buf in self._postings.items():
+                rows, tfs = _decode_postings(bytes(buf))
+                new_rows = remap[rows]
+                keep = new_rows >= 0
+                if not keep.any():
+                    continue
+                new_rows, tfs = new_rows[keep], tfs[keep]
+                out = bytearray()
+                prev = 0
+                for row, tf in zip(new_rows.tolist(), tfs.tolist()):
+                    _append_varint(out, row - prev)
+                    _append_varint(out, tf)
+                    prev = row
+                postings[term] = out
+                last_row[term] = prev
+
+            chunk_ids = [self._chunk_ids[r] for r in live]
+            doc_ids = [self._doc_ids[r] for r in live]
+            lengths = array("I", (self._lengths[r] for r in live))
+            self._reset()
+            self._postings, self._last_row = postings, last_row
+            self._chunk_ids, self._doc_ids, self._lengths = chunk_ids, doc_ids, lengths
+            self._rebuild_maps()
+            self._dirty = True
+
+    def _rebuild_maps(self) -> None:
+        self._rows = {}
+        self._doc_rows = {}
+        self._live_tokens = 0
+        self._alive = bytearray(b"\x01") * len(self._chunk_ids)
+        for row, (chunk_id, doc_id) in enumerate(zip(self._chunk_ids, self._doc_ids)):
+            if row in self._dead:
+                self._alive[row] = 0
+                continue
+            self._rows[chunk_id] = row
+            self._doc_rows.setdefault(doc_id, set()).add(row)
+            self._live_tokens += self._lengths[row]
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Search
+    # ─────────────────────────────────────────────────────────────────────
+
+    def search(self, query: str, top_k: int = 20, doc_id: Optional[str] = None) -> list[tuple[str, float]]:
+        """BM25 top-k as (chunk_id, score), best first."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n_live = len(self._rows)
+            if not terms or n_live == 0:
+                return []
+            avgdl = max(self._live_tokens / n_live, 1.0)
+            # Zero-copy views; not kept past this call (arrays can't grow while exported)
+            lengths = np.frombuffer(self._lengths, dtype=np.uint32)
+            alive = np.frombuffer(self._alive, dtype=np.bool_)
+            scores = np.zeros(len(self._chunk_ids), dtype=np.float32)
+            for term in terms:
+                buf = self._postings.get(term)
+                if not buf:
+                    continue
+                rows, tfs = _decode_postings(bytes(buf))
+                live = alive[rows]
+                rows, tfs = rows[live], tfs[live]
+                df = len(rows)
+                if df == 0:
+                    continue
+                idf = math.log(1.0 + (n_live - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1.0 - self.b + self.b * lengths[rows] / avgdl)
+                scores[rows] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+            del lengths, alive
+
+            if doc_id is not None:
+                candidates = np.fromiter(self._doc_rows.get(doc_id, ()), dtype=np.int64)
+            else:
+                candidates = np.flatnonzero(scores)
+            candidates = candidates[scores[candidates] > 0]
+            if len(candidates) == 0:
+                return []
+
+            k = min(top_k, len(candidates))
+            top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self._chunk_ids[row], float(scores[row])) for row in top]
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Persistence
+    # ─────────────────────────────────────────────────────────────────────
+
+    def flush(self) -> None:
+        """Write the index if it changed since the last flush (atomic replace)."""
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            terms = list(self._postings)
+            sizes = np.fromiter((len(self._postings[t]) for t in terms), dtype=np.int64, count=len(terms))
+            blob = b"".join(bytes(self._postings[t]) for t in terms)
+            header = {
+                "terms": terms,
+                "chunk_ids": self._chunk_ids,
+                "doc_ids": self._doc_ids,
+                "dead": sorted(self._dead)
+            }
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp.npz")
+            np.savez(
+                tmp,
+                header=np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8),
+                sizes=sizes,
+                last_rows=np.fromiter((self._last_row[t] for t in terms), dtype=np.int64, count=len(terms)),
+                postings=np.frombuffer(blob, dtype=np.uint8),
+                lengths=np.array(self._lengths, dtype=np.uint32)
+            )
+            os.replace(tmp, self.path)
+            self._dirty = False
+
+    def _load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        with np.load(self.path) as data:
+            header = json.loads(data["header"].tobytes().decode("utf-8"))
+            sizes = data["sizes"].tolist()
+            last_rows = data["last_rows"].tolist()
+            blob = data["postings"].tobytes()
+            lengths = data["lengths"]
+
+        pos = 0
+        for term, size, last in zip(header["terms"], sizes, last_rows):
+            self._postings[term] = bytearray(blob[pos:pos + size])
+            self._last_row[term] = last
+            pos += size
+        self._chunk_ids = header["chunk_ids"]
+        self._doc_ids = header["doc_ids"]
+        self._dead = set(header["dead"])
+        self._lengths = array("I", lengths.astype(np.uint32).tobytes())
+        self._rebuild_maps()
+        print(f"✅ BM25 index loaded: {len(self._rows)} chunks, {len(self._postings)} terms")
+
+
+_index: Optional[BM25Index] = None
+
+
+def get_bm25_index() -> BM25Index:
+    """Get or create the BM25 index."""
+    global _index
+    if _index is None:
+        _index = BM25Index()
+    return _index
@@ -11,17 +11,41 @@ Design choices:
   more wastes storage/compute.
 - Token-based (not char): Aligns with LLM tokenization, giving predictable
   behavior when chunks are passed to embeddings and generation models.
+- Single-pass splitting: The document is encoded ONCE and split points are
+  chosen from token offsets. A recursive splitter with a token length
+  function re-encodes every candidate split and merge, which is superlinear
+  on long PDFs (see benchmarks/bench_chunker.py).
 """
 
+from bisect import bisect_left
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Optional
+from functools import lru_cache
+from itertools import accumulate
+from typing import Iterable, Iterator, Optional
 from uuid import uuid4
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 import tiktoken
 
 
+# Split preference, highest priority first. A boundary is placed at the
+# best separator found in the back half of the token window; if none is
+# found the window is cut at the token limit (character-level fallback).
+SEPARATORS = [
+    "\n\n",      # Paragraph breaks (highest priority)
+    "\n",        # Line breaks
+    ". ",        # Sentence ends
+    "? ",
+    "! ",
+    "; ",        # Clause breaks
+    ", ",        # Phrase breaks
+    " ",         # Words (last resort)
+]
+
+# Streaming: split once roughly this many chunks of text are buffered
+STREAM_BUFFER_CHUNKS = 8
+
+
 @dataclass
 class Chunk:
     """A single chunk with metadata for citation tracking."""
@@ -29,7 +53,7 @@ class Chunk:
     doc_id: str
     text: str
     index: int              # Position in original document (0-based)
-    total_chunks: int       # Total chunks from this document
+    total_chunks: int       # Total chunks from this document (0 if streamed)
     char_start: int         # Character offset in source
     char_end: int           # Character end offset
     token_count: int        # Actual token count
@@ -52,10 +76,213 @@ class Chunk:
         }
 
 
+@dataclass
+class TextSplit:
+    """A piece of text produced by the splitter, with its source span."""
+    text: str
+    char_start: int         # Character offset in source
+    char_end: int           # Character end offset (exclusive)
+    token_count: int
+
+
+class TokenOffsetSplitter:
+    """
+    Separator-aware splitter that works directly on token offsets.
+
+    The text is encoded once; each chunk is a contiguous token range
+    [start, end). The end is moved back to the highest-priority separator
+    in the second half of the window, and the next chunk starts
+    `chunk_overlap` tokens before it (snapped forward to a word start).
+    Token counts come from the ranges, so nothing is re-encoded.
+
+    Offsets are tracked in UTF-8 bytes: token byte lengths come from a
+    per-vocabulary lookup table, which is much cheaper than decoding
+    every token back to text. Byte offsets are converted to character
+    offsets with a forward-only cursor, so each split carries its exact
+    source span in one linear pass.
+    """
+
+    def __init__(
+        self,
+        encoding: tiktoken.Encoding,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 120,
+        separators: Optional[list[str]] = None
+    ):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = [
+            sep.encode("utf-8") for sep in (separators or SEPARATORS)
+        ]
+        # Don't accept a separator that would leave the chunk under half full
+        self.min_tokens = max(1, chunk_size // 2)
+        self._token_bytes = _token_byte_lengths(encoding)
+
+    def _encode(self, text: str) -> list[int]:
+        """Encode once and return the byte offset of each token (plus the end)."""
+        # Special-token strings in user documents are treated as plain text
+        tokens = self.encoding.encode(text, disallowed_special=())
+        return list(accumulate(map(self._token_bytes.__getitem__, tokens), initial=0))
+
+    def _char_boundary(self, data: bytes, offsets: list[int], i: int, floor: int) -> int:
+        """Move token index i back until it starts a UTF-8 character."""
+        while i > floor and (data[offsets[i]] & 0xC0) == 0x80:
+            i -= 1
+        return i
+
+    def _find_boundary(self, data: bytes, offsets: list[int], start: int, end: int) -> int:
+        """Pick the token index to cut at, in (start, end]."""
+        lo = offsets[start + self.min_tokens]
+        hi = offsets[end]
+        for sep in self.separators:
+            pos = data.rfind(sep, lo, hi)
+            if pos == -1:
+                continue
+            # Cut after the separator's punctuation/newlines; a trailing space
+            # belongs to the next word's token in BPE vocabularies.
+            cut = pos + len(sep.rstrip(b" "))
+            boundary = bisect_left(offsets, cut, start + 1, end)
+            return self._char_boundary(data, offsets, boundary, start + 1)
+        # No separator: hard cut at the token limit, but never inside a character
+        boundary = self._char_boundary(data, offsets, end, start + 1)
+        return boundary if boundary > start else end
+
+    def _next_start(self, data: bytes, offsets: list[int], start: int, end: int) -> int:
+        """First token of the next chunk: `chunk_overlap` back, at a word start."""
+        candidate = max(start + 1, end - self.chunk_overlap)
+        for i in range(candidate, end):
+            pos = offsets[i]
+            if data[pos:pos + 1].isspace() or data[pos - 1:pos].isspace():
+                return i
+        return self._char_boundary(data, offsets, candidate, start + 1)
+
+    def _split_buffer(
+        self,
+        text: str,
+        base_char: int = 0,
+        final: bool = True
+    ) -> tuple[list[TextSplit], int]:
+        """
+        Split one buffer of text.
+
+        With final=False, stops before the last window (its end isn't known
+        yet) and returns how many characters were consumed; the caller keeps
+        text[consumed:] and prepends it to the next buffer.
+        """
+        data = text.encode("utf-8", errors="surrogatepass")
+        offsets = self._encode(text)
+        n_tokens = len(offsets) - 1
+        to_char = _CharCursor(data, ascii_only=len(data) == len(text))
+        splits = []
+        start = 0
+
+        while start < n_tokens:
+            if n_tokens - start <= self.chunk_size:
+                if not final:
+                    break
+                end = n_tokens
+            else:
+                end = self._find_boundary(data, offsets, start, start + self.chunk_size)
+
+            char_start = to_char(offsets[start])
+            char_end = to_char.peek(offsets[end])
+            piece = text[char_start:char_end]
+            if piece.strip():
+                splits.append(TextSplit(
+                    text=piece,
+                    char_start=base_char + char_start,
+                    char_end=base_char + char_end,
+                    token_count=end - start
+                ))
+
+            if end == n_tokens:
+                return splits, len(text)
+            start = self._next_start(data, offsets, start, end)
+
+        return splits, to_char(offsets[start]) if start < n_tokens else len(text)
+
+    def split(self, text: str) -> list[TextSplit]:
+        """Split text into token-bounded pieces with exact character spans."""
+        splits, _ = self._split_buffer(text)
+        return splits
+
+    def iter_split(self, pieces: Iterable[str]) -> Iterator[TextSplit]:
+        """
+        Lazily split a stream of text pieces (pages, blocks).
+
+        Only a bounded buffer (about STREAM_BUFFER_CHUNKS chunks of text plus
+        the unfinished tail) is held at a time; offsets are relative to the
+        concatenated stream.
+        """
+        flush_chars = self.chunk_size * 4 * STREAM_BUFFER_CHUNKS  # ~4 chars/token
+        buffer = ""
+        base_char = 0
+
+        for piece in pieces:
+            buffer += piece
+            if len(buffer) < flush_chars:
+                continue
+            splits, consumed = self._split_buffer(buffer, base_char, final=False)
+            yield from splits
+            buffer = buffer[consumed:]
+            base_char += consumed
+
+        if buffer:
+            splits, _ = self._split_buffer(buffer, base_char, final=True)
+            yield from splits
+
+
+class _CharCursor:
+    """
+    Converts increasing UTF-8 byte offsets to character offsets.
+
+    Only the bytes between consecutive calls are decoded, so walking a
+    document costs O(document) overall instead of O(document) per chunk.
+    """
+
+    def __init__(self, data: bytes, ascii_only: bool):
+        self.data = data
+        self.ascii_only = ascii_only
+        self.byte_pos = 0
+        self.char_pos = 0
+
+    def _count(self, start: int, end: int) -> int:
+        return len(self.data[start:end].decode("utf-8", errors="surrogatepass"))
+
+    def peek(self, byte_pos: int) -> int:
+        """Character offset of byte_pos without moving the cursor."""
+        if self.ascii_only:
+            return byte_pos
+        return self.char_pos + self._count(self.byte_pos, byte_pos)
+
+    def __call__(self, byte_pos: int) -> int:
+        """Advance the cursor to byte_pos and return its character offset."""
+        self.char_pos = self.peek(byte_pos)
+        self.byte_pos = byte_pos
+        return self.char_pos
+
+
+@lru_cache(maxsize=4)
+def _token_byte_lengths(encoding: tiktoken.Encoding) -> list[int]:
+    """Byte length of every token id in the vocabulary (built once per encoding)."""
+    lengths = []
+    for token in range(encoding.n_vocab):
+        try:
+            lengths.append(len(encoding.decode_single_token_bytes(token)))
+        except KeyError:
+            lengths.append(0)  # Unused id between regular and special tokens
+    return lengths
+
+
 class TokenChunker:
     """
-    Token-aware text splitter using tiktoken for accurate counting
-    and LangChain's RecursiveCharacterTextSplitter for intelligent splitting.
+    Token-aware text chunker.
+
+    Uses tiktoken for counting and TokenOffsetSplitter for separator-aware
+    splitting in a single encoding pass.
     """
 
     def __init__(
@@ -67,29 +294,15 @@ class TokenChunker:
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         self.encoding = tiktoken.get_encoding(model_name)
-        
-        # LangChain splitter with token-based length function
-        self.splitter = RecursiveCharacterTextSplitter(
+        self.splitter = TokenOffsetSplitter(
+            self.encoding,
             chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=self._token_length,
-            separators=[
-                "\n\n",      # Paragraph breaks (highest priority)
-                "\n",        # Line breaks
-                ". ",        # Sentence ends
-                "? ",
-                "! ",
-                "; ",        # Clause breaks
-                ", ",        # Phrase breaks
-                " ",         # Words (last resort)
-                ""           # Characters (fallback)
-            ],
-            keep_separator=True
+            chunk_overlap=chunk_overlap
         )
 
     def _token_length(self, text: str) -> int:
         """Count tokens using tiktoken."""
-        return len(self.encoding.encode(text))
+        return len(self.encoding.encode(text, disallowed_special=()))
 
     def chunk_text(
         self,
@@ -115,34 +328,21 @@ class TokenChunker:
         metadata = metadata or {}
         now = datetime.now(timezone.utc).isoformat()
 
-        # Split with LangChain
-        splits = self.splitter.split_text(text)
+        # Split on token offsets (single encoding pass, exact source spans)
+        splits = self.splitter.split(text)
         total_chunks = len(splits)
 
-        # Track character positions for citation linking
         chunks = []
-        search_start = 0
-
-        for idx, split_text in enumerate(splits):
-            # Find actual position in source document
-            char_start = text.find(split_text, search_start)
-            if char_start == -1:
-                # Fallback: overlapping text may not match exactly
-                char_start = search_start
-            char_end = char_start + len(split_text)
-            
-            # Move search window (account for overlap)
-            search_start = max(search_start, char_start + 1)
-
+        for idx, split in enumerate(splits):
             chunk = Chunk(
                 chunk_id=f"{doc_id}_chunk_{idx:04d}",
                 doc_id=doc_id,
-                text=split_text,
+                text=split.text,
                 index=idx,
                 total_chunks=total_chunks,
-                char_start=char_start,
-                char_end=char_end,
-                token_count=self._token_length(split_text),
+                char_start=split.char_start,
+                char_end=split.char_end,
+                token_count=split.token_count,
                 created_at=now,
                 metadata=metadata
             )
@@ -150,6 +350,36 @@ class TokenChunker:
 
         return chunks
 
+    def iter_chunks(
+        self,
+        pieces: Iterable[str],
+        doc_id: Optional[str] = None,
+        metadata: Optional[dict] = None
+    ) -> Iterator[Chunk]:
+        """
+        Lazily chunk a stream of text pieces (see file_extractor.iter_text).
+
+        Same chunks as chunk_text on the joined text, except total_chunks
+        is 0: the count isn't known until the stream ends.
+        """
+        doc_id = doc_id or f"doc_{uuid4().hex[:12]}"
+        metadata = metadata or {}
+        now = datetime.now(timezone.utc).isoformat()
+
+        for idx, split in enumerate(self.splitter.iter_split(pieces)):
+            yield Chunk(
+                chunk_id=f"{doc_id}_chunk_{idx:04d}",
+                doc_id=doc_id,
+                text=split.text,
+                index=idx,
+                total_chunks=0,
+                char_start=split.char_start,
+                char_end=split.char_end,
+                token_count=split.token_count,
+                created_at=now,
+                metadata=metadata
+            )
+
 
 # Module-level instance for simple imports
 _default_chunker: Optional[TokenChunker] = None
@@ -187,3 +417,22 @@ def chunk_text(
     """
     chunker = get_chunker(chunk_size, chunk_overlap)
     return chunker.chunk_text(text, doc_id, metadata)
+
+
+def iter_chunks(
+    pieces: Iterable[str],
+    doc_id: Optional[str] = None,
+    metadata: Optional[dict] = None,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 120
+) -> Iterator[Chunk]:
+    """
+    Streaming counterpart of chunk_text: yields chunks as text arrives.
+    
+    Example:
+        pieces = iter_text("report.pdf", content)
+        for chunk in iter_chunks(pieces, doc_id="report"):
+            ...
+    """
+    chunker = get_chunker(chunk_size, chunk_overlap)
+    return chunker.iter_chunks(pieces, doc_id, metadata)
@@ -0,0 +1,321 @@
+"""
+Token-budgeted context assembly for the answer prompt.
+
+Why:
+- generate_answer used to put every reranked chunk in the prompt: five
+  1000-token chunks plus the system prompt, whether or not the weaker ones
+  add anything. Prompt tokens drive Groq latency and quota
+- Packing against a fixed budget bounds prompt size, and so generation
+  latency, per query
+
+Packing (chunks arrive best-first from the reranker):
+1. Merge: chunks N and N+1 of one document share ~120 tokens of overlap;
+   adjacent or overlapping chunks (same doc_id, consecutive chunk_index,
+   touching char spans) become one span with the overlap sent once. The
+   span keeps every chunk_id it covers for citations
+   (CONTEXT_MERGE_ADJACENT)
+2. Fixed cost: system prompt, template and question
+3. Tail trim: chunks scoring below CONTEXT_MIN_SCORE_RATIO × the best
+   score are dropped even if they'd fit (low-value tails)
+4. Greedy fill: each chunk costs its stored token_count plus its
+   "[i] (from: title): " prefix; one that doesn't fit is cut to the
+   remaining budget at a sentence/line boundary if at least
+   CONTEXT_MIN_PARTIAL_TOKENS remain, else dropped
+5. Neighbour expansion (CONTEXT_EXPAND_NEIGHBOURS, off by default): for
+   answers that straddle a chunk boundary, the chunks just before/after
+   each packed span ({doc_id}_chunk_{i:04d}) are fetched in one bulk
+   lookup and spliced onto the span while leftover budget allows. Cheaper
+   than raising retrieve_k, which costs rerank and similarity work
+
+Token counts come from chunk metadata (written at ingest); only chunks
+without one (e.g. vectors written before it was stored) are tokenized.
+Counts use the chunker's cl100k encoding, close to but not exactly the
+Llama tokenizer, so leave some headroom below the model's limit.
+
+CONTEXT_TOKEN_BUDGET=0 disables packing (all reranked chunks are sent).
+"""
+
+from __future__ import annotations
+import os
+from dataclasses import dataclass, field, replace
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .retriever import RetrievedChunk
+
+# Whole-prompt budget (system prompt + question + context), in tokens
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3500"))
+CONTEXT_MIN_SCORE_RATIO = float(os.getenv("CONTEXT_MIN_SCORE_RATIO", "0.2"))
+CONTEXT_MIN_PARTIAL_TOKENS = int(os.getenv("CONTEXT_MIN_PARTIAL_TOKENS", "128"))
+CONTEXT_MERGE_ADJACENT = os.getenv("CONTEXT_MERGE_ADJACENT", "true").lower() in ("1", "true", "yes")
+# Neighbours to try on each side of a packed span (0 disables expansion)
+CONTEXT_EXPAND_NEIGHBOURS = int(os.getenv("CONTEXT_EXPAND_NEIGHBOURS", "0"))
+
+# Preferred cut points when a chunk is truncated, best first
+_CUT_MARKS = ("\n\n", "\n", ". ", "? ", "! ")
+
+
+@dataclass
+class PackedContext:
+    """Chunks selected for the prompt, with the accounting behind them."""
+    chunks: list[RetrievedChunk]        # In citation order (best first)
+    tokens: int                         # Estimated prompt tokens
+    rerank_count: int                   # Chunks offered by the reranker
+    merged: int = 0                     # Chunks folded into a neighbour's span
+    dropped: list[str] = field(default_factory=list)    # chunk_ids left out
+    truncated: list[str] = field(default_factory=list)  # chunk_ids cut short
+    expanded: list[str] = field(default_factory=list)   # Neighbour chunk_ids spliced in
+
+
+def _encoding():
+    from .chunker import get_chunker
+    return get_chunker().encoding
+
+
+def count_tokens(text: str) -> int:
+    return len(_encoding().encode(text, disallowed_special=()))
+
+
+def chunk_tokens(chunk: RetrievedChunk) -> int:
+    """Stored token count, tokenizing only when it's missing."""
+    if chunk.token_count is not None:
+        return chunk.token_count
+    return count_tokens(chunk.text)
+
+
+def _prefix(index: int, chunk: RetrievedChunk) -> str:
+    """Mirror of llm.build_messages' per-chunk framing."""
+    title = chunk.metadata.get("title", "")
+    title_str = f" (from: {title})" if title else ""
+    return f"[{index}]{title_str}: "
+
+
+def span_ids(chunk: RetrievedChunk) -> list[str]:
+    """Every chunk_id a (possibly merged) chunk covers, in document order."""
+    return chunk.chunk_ids or [chunk.chunk_id]
+
+
+def _join(left: RetrievedChunk, right: RetrievedChunk) -> Optional[RetrievedChunk]:
+    """left + right without their shared text, or None if they don't touch."""
+    overlap = left.char_end - right.char_start
+    if overlap < 0 or overlap > len(right.text) or not left.text.endswith(right.text[:overlap]):
+        return None    # Gap between them, or text that isn't the exact source span
+    tail = right.text[overlap:]
+    token_count = None
+    if left.token_count is not None and right.token_count is not None:
+        # Overlap tokens pro rata by characters; avoids re-tokenizing the span
+        token_count = left.token_count + round(right.token_count * len(tail) / max(len(right.text), 1))
+    return replace(
+        left,
+        text=left.text + tail,
+        score=max(left.score, right.score),
+        char_end=right.char_end,
+        token_count=token_count,
+        chunk_ids=span_ids(left) + span_ids(right),
+        embedding=None
+    )
+
+
+def merge_adjacent(chunks: list[RetrievedChunk]) -> list[RetrievedChunk]:
+    """
+    Merge adjacent/overlapping chunks of the same document into single spans.
+
+    A span takes the best score of its members and the citation slot of
+    its best-ranked member; other chunks keep their order.
+    """
+    if len(chunks) < 2:
+        return list(chunks)
+
+    by_doc: dict[str, list[tuple[int, RetrievedChunk]]] = {}
+    for rank, chunk in enumerate(chunks):
+        by_doc.setdefault(chunk.doc_id, []).append((rank, chunk))
+
+    spans: list[tuple[int, RetrievedChunk]] = []
+    for members in by_doc.values():
+        members.sort(key=lambda item: (item[1].chunk_index, item[1].char_start))
+        rank, current = members[0]
+        last_index = current.chunk_index
+        for next_rank, chunk in members[1:]:
+            joined = _join(current, chunk) if chunk.chunk_index == last_index + 1 else None
+            if joined is not None:
+                current, rank = joined, min(rank, next_rank)
+            else:
+                spans.append((rank, current))
+                rank, current = next_rank, chunk
+            last_index = chunk.chunk_index
+        spans.append((rank, current))
+
+    spans.sort(key=lambda item: item[0])
+    return [chunk for _, chunk in spans]
+
+
+def _neighbour_id(doc_id: str, index: int) -> str:
+    """Chunk ID convention from chunker: {doc_id}_chunk_{index:04d}."""
+    return f"{doc_id}_chunk_{index:04d}"
+
+
+def _neighbour_ids(span: RetrievedChunk, step: int) -> tuple[Optional[str], Optional[str]]:
+    """(after, before) neighbour IDs `step` chunks beyond a span's ends."""
+    first = span.chunk_index
+    last = first + len(span_ids(span)) - 1
+    after = last + step
+    before = first - step
+    return (
+        _neighbour_id(span.doc_id, after) if not span.total_chunks or after < span.total_chunks else None,
+        _neighbour_id(span.doc_id, before) if before >= 0 else None
+    )
+
+
+def expand_neighbours(
+    spans: list[RetrievedChunk],
+    remaining: int,
+    window: int
+) -> tuple[list[RetrievedChunk], int, list[str]]:
+    """
+    Splice neighbouring chunks onto spans while they fit in `remaining` tokens.
+
+    Best span first, nearest neighbours first, following chunk before the
+    preceding one. All candidate neighbours come from one bulk fetch.
+
+    Returns:
+        (spans, remaining tokens, neighbour chunk_ids added)
+    """
+    from .retriever import fetch_chunks
+
+    covered = {chunk_id for span in spans for chunk_id in span_ids(span)}
+    wanted = [
+        chunk_id
+        for span in spans
+        for step in range(1, window + 1)
+        for chunk_id in _neighbour_ids(span, step)
+        if chunk_id is not None and chunk_id not in covered
+    ]
+    if not wanted:
+        return spans, remaining, []
+    neighbours = {chunk.chunk_id: chunk for chunk in fetch_chunks(list(dict.fromkeys(wanted)))}
+
+    spans = list(spans)
+    added: list[str] = []
+    for i in range(len(spans)):
+        for _ in range(window):
+            # One step out from the span's current ends, as it grows
+            after_id, before_id = _neighbour_ids(spans[i], 1)
+            for chunk_id, after in ((after_id, True), (before_id, False)):
+                neighbour = neighbours.get(chunk_id)
+                if neighbour is None or chunk_id in covered:
+                    continue
+                span = spans[i]
+                joined = _join(span, neighbour) if after else _join(neighbour, span)
+                if joined is None:
+                    continue
+                if not after:
+                    # Keep the hit's identity; the span now starts at the neighbour
+                    joined = replace(joined, chunk_id=span.chunk_id, score=span.score, metadata=span.metadata)
+                cost = chunk_tokens(joined) - chunk_tokens(span)
+                if cost > remaining:
+                    continue
+                spans[i] = joined
+                remaining -= cost
+                covered.add(chunk_id)
+                added.append(chunk_id)
+    return spans, remaining, added
+
+
+def _truncate(chunk: RetrievedChunk, max_tokens: int) -> Optional[RetrievedChunk]:
+    """First max_tokens of the chunk, cut back to a natural boundary."""
+    encoding = _encoding()
+    tokens = encoding.encode(chunk.text, disallowed_special=())[:max_tokens]
+    text = encoding.decode(tokens)
+    cut = max(text.rfind(mark) for mark in _CUT_MARKS)
+    if cut > len(text) // 2:
+        text = text[:cut + 1].rstrip()
+    if not text.strip():
+        return None
+    return replace(
+        chunk,
+        text=text,
+        char_end=chunk.char_start + len(text),
+        token_count=count_tokens(text)
+    )
+
+
+def pack_context(
+    question: str,
+    chunks: list[RetrievedChunk],
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    min_score_ratio: float = CONTEXT_MIN_SCORE_RATIO,
+    min_partial_tokens: int = CONTEXT_MIN_PARTIAL_TOKENS,
+    expand_window: int = CONTEXT_EXPAND_NEIGHBOURS
+) -> PackedContext:
+    """
+    Fit the best reranked chunks into the prompt token budget.
+
+    Args:
+        question: User question (counted against the budget)
+        chunks: Reranked chunks, best first
+        budget: Whole-prompt token budget (0 = no limit)
+        min_score_ratio: Drop chunks scoring below this fraction of the best
+        min_partial_tokens: Smallest remainder worth filling with a truncated chunk
+        expand_window: Neighbours to try on each side of a packed span
+                       (0 = none; needs a budget)
+
+    Returns:
+        PackedContext; chunks keep their reranked order
+    """
+    from .llm import CONTEXT_TEMPLATE, SYSTEM_PROMPT
+
+    rerank_count = len(chunks)
+    if CONTEXT_MERGE_ADJACENT:
+        chunks = merge_adjacent(chunks)
+    merged = rerank_count - len(chunks)
+
+    fixed = count_tokens(SYSTEM_PROMPT) + count_tokens(CONTEXT_TEMPLATE.format(context="", question=question))
+    if budget <= 0 or not chunks:
+        total = fixed + sum(chunk_tokens(c) + count_tokens(_prefix(i, c)) for i, c in enumerate(chunks, 1))
+        return PackedContext(chunks=list(chunks), tokens=total, rerank_count=rerank_count, merged=merged)
+
+    best = max(max(chunk.score for chunk in chunks), 0.0)
+    remaining = budget - fixed
+    packed: list[RetrievedChunk] = []
+    dropped: list[str] = []
+    truncated: list[str] = []
+
+    for chunk in chunks:
+        if packed and chunk.score < best * min_score_ratio:
+            dropped.extend(span_ids(chunk))
+            continue
+
+        overhead = count_tokens(_prefix(len(packed) + 1, chunk)) + 1  # + "\n\n" separator
+        cost = chunk_tokens(chunk) + overhead
+        if cost <= remaining:
+            packed.append(chunk)
+            remaining -= cost
+            continue
+
+        partial = None
+        if remaining - overhead >= min_partial_tokens:
+            partial = _truncate(chunk, remaining - overhead)
+        if partial is None:
+            dropped.extend(span_ids(chunk))
+            continue
+        packed.append(partial)
+        truncated.extend(span_ids(chunk))
+        remaining -= partial.token_count + overhead
+
+    expanded: list[str] = []
+    if expand_window > 0 and packed and remaining > 0:
+        cut = set(truncated)
+        whole = [span for span in packed if span.chunk_id not in cut]
+        grown, remaining, expanded = expand_neighbours(whole, remaining, expand_window)
+        by_id = {span.chunk_id: span for span in grown}
+        packed = [by_id.get(span.chunk_id, span) for span in packed]
+
+    return PackedContext(
+        chunks=packed,
+        tokens=budget - remaining,
+        rerank_count=rerank_count,
+        merged=merged,
+        dropped=dropped,
+        truncated=truncated,
+        expanded=expanded
+    )
@@ -0,0 +1,165 @@
+"""
+Persistent document registry (SQLite).
+
+Why:
+- Vector indexes have no DISTINCT doc_id query; scanning with a dummy
+  vector is slow and silently misses documents once the index grows
+- One row per document, kept up to date by ingest and delete, makes
+  /documents an indexed O(page) read
+
+Schema (documents):
+- doc_id (PK), title, chunk_count, chunk_ids (JSON list), created_at,
+  byte_size (UTF-8 bytes of the ingested text)
+- Index on (created_at, doc_id) for newest-first cursor pagination
+
+Cursors are opaque base64 tokens of the last row's (created_at, doc_id).
+"""
+
+from __future__ import annotations
+import base64
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+
+DATA_DIR = os.getenv("DATA_DIR", "data")
+REGISTRY_PATH = os.getenv("REGISTRY_PATH", os.path.join(DATA_DIR, "documents.sqlite3"))
+
+
+def _encode_cursor(created_at: str, doc_id: str) -> str:
+    raw = json.dumps([created_at, doc_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return created_at, doc_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class DocumentRegistry:
+    """SQLite-backed table of ingested documents."""
+
+    def __init__(self, path: str = REGISTRY_PATH):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    doc_id      TEXT PRIMARY KEY,
+                    title       TEXT,
+                    chunk_count INTEGER NOT NULL,
+                    chunk_ids   TEXT NOT NULL,
+                    created_at  TEXT NOT NULL,
+                    byte_size   INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_documents_created "
+                "ON documents (created_at, doc_id)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row, include_chunk_ids: bool = False) -> dict:
+        doc = {
+            "doc_id": row["doc_id"],
+            "title": row["title"],
+            "total_chunks": row["chunk_count"],
+            "created_at": row["created_at"],
+            "byte_size": row["byte_size"],
+        }
+        if include_chunk_ids:
+            doc["chunk_ids"] = json.loads(row["chunk_ids"])
+        return doc
+
+    def upsert(
+        self,
+        doc_id: str,
+        title: Optional[str],
+        chunk_ids: list[str],
+        created_at: str,
+        byte_size: int
+    ) -> None:
+        """Insert or replace a document's row (re-ingest replaces)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents "
+                "(doc_id, title, chunk_count, chunk_ids, created_at, byte_size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (doc_id, title, len(chunk_ids), json.dumps(chunk_ids), created_at, byte_size)
+            )
+            self._conn.commit()
+
+    def remove(self, doc_id: str) -> bool:
+        """Delete a document's row. Returns False if it wasn't registered."""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        """One document including its chunk IDs, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM documents WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+        return self._row_to_dict(row, include_chunk_ids=True) if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def list_page(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> tuple[list[dict], Optional[str]]:
+        """
+        Newest-first page of documents.
+
+        Returns:
+            (documents, next_cursor) — next_cursor is None on the last page
+
+        Raises:
+            ValueError: If cursor is malformed
+        """
+        params: list = []
+        where = ""
+        if cursor:
+            where = "WHERE (created_at, doc_id) < (?, ?)"
+            params.extend(_decode_cursor(cursor))
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc_id, title, chunk_count, created_at, byte_size FROM documents "
+                f"{where} ORDER BY created_at DESC, doc_id DESC LIMIT ?",
+                (*params, limit + 1)
+            ).fetchall()
+
+        docs = [self._row_to_dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = docs[-1]
+            next_cursor = _encode_cursor(last["created_at"], last["doc_id"])
+        return docs, next_cursor
+
+
+_registry: Optional[DocumentRegistry] = None
+
+
+def get_registry() -> DocumentRegistry:
+    """Get or create the document registry."""
+    global _registry
+    if _registry is None:
+        _registry = DocumentRegistry()
+    return _registry
@@ -8,9 +8,36 @@ Model: embed-english-light-v3.0
 - Memory: ~0MB (API-based, no local model)
 
 This avoids OOM issues on Render free tier (512MB limit).
+
+Batching:
+- Cohere accepts at most 96 texts per embed request
+- Larger inputs are split into provider-sized batches and sent concurrently
+  over a bounded thread pool; results are reassembled in input order
+
+Caching:
+- Content-addressed: key = sha256(model, input_type, text)
+- Tier 1: bounded in-process LRU (float32 arrays, ~1.5KB per vector)
+- Tier 2: SQLite file under DATA_DIR, survives restarts; capped at
+  EMBED_CACHE_DISK_ITEMS rows, oldest written evicted first
+- Every vector (hit or fresh miss) is returned float32-rounded, so a query
+  ranks the same on a cold run as on a warm one
+- Only cache misses reach the API; counters via get_cache_stats()
+
+Query micro-batching:
+- embed_query_async() coalesces queries arriving within a short window
+  (EMBED_QUERY_WINDOW_MS, up to EMBED_QUERY_MAX_BATCH) into one embed call
+  and fans the vectors back out to the waiting callers
 """
 
+import asyncio
+import hashlib
 import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Optional
 import cohere
 
@@ -18,6 +45,20 @@ import cohere
 MODEL_NAME = "embed-english-light-v3.0"
 EMBEDDING_DIMENSION = 384
 
+# Provider per-request limit and client-side concurrency
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "96"))
+EMBED_MAX_WORKERS = int(os.getenv("EMBED_MAX_WORKERS", "4"))
+
+# Cache config (EMBED_CACHE_PATH="" disables the on-disk tier)
+DATA_DIR = os.getenv("DATA_DIR", "data")
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "5000"))
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.join(DATA_DIR, "embeddings.sqlite3"))
+EMBED_CACHE_DISK_ITEMS = int(os.getenv("EMBED_CACHE_DISK_ITEMS", "50000"))   # ~1.6KB per row
+
+# Query micro-batching (EMBED_QUERY_WINDOW_MS=0 disables coalescing)
+EMBED_QUERY_WINDOW_MS = float(os.getenv("EMBED_QUERY_WINDOW_MS", "5"))
+EMBED_QUERY_MAX_BATCH = int(os.getenv("EMBED_QUERY_MAX_BATCH", str(EMBED_BATCH_SIZE)))
+
 # Lazy-loaded client singleton
 _client: Optional[cohere.Client] = None
 
@@ -34,44 +75,318 @@ def get_client() -> cohere.Client:
     return _client
 
 
+# ═══════════════════════════════════════════════════════════════════════════
+# EMBEDDING CACHE
+# ═══════════════════════════════════════════════════════════════════════════
+
+class EmbeddingCache:
+    """Two-tier (memory LRU → SQLite) content-addressed embedding cache."""
+
+    def __init__(self, max_items: int, path: Optional[str], max_disk_items: int = EMBED_CACHE_DISK_ITEMS):
+        self.max_items = max_items
+        self.path = path
+        self.max_disk_items = max_disk_items
+        self._disk_items = 0     # Upper bound (replacements are counted as inserts)
+        self._lru: OrderedDict[str, array] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str, input_type: str, model: str = MODEL_NAME) -> str:
+        digest = hashlib.sha256(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+        return f"{model}:{input_type}:{digest}"
+
+    def _get_db(self) -> Optional[sqlite3.Connection]:
+        """Open the SQLite tier lazily (first lookup)."""
+        if self._db is None and self.path:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+            )
+            self._disk_items = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return self._db
+
+    def _evict_disk(self, db: sqlite3.Connection) -> None:
+        """Drop the oldest rows beyond max_disk_items (rowid = write order)."""
+        self._disk_items = db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = self._disk_items - self.max_disk_items
+        if excess > 0:
+            db.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY rowid LIMIT ?)",
+                (excess,)
+            )
+            self._disk_items -= excess
+
+    def _remember(self, key: str, vector: array) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """Look up keys; returns only the hits."""
+        found: dict[str, array] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = vector
+            self.memory_hits += len(found)
+
+            missing = [k for k in dict.fromkeys(keys) if k not in found]
+            db = self._get_db() if missing else None
+            if db is not None:
+                # Stay well under SQLite's bound-parameter limit
+                for i in range(0, len(missing), 500):
+                    part = missing[i:i + 500]
+                    rows = db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})",
+                        part
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = array("f")
+                        vector.frombytes(blob)
+                        found[key] = vector
+                        self._remember(key, vector)
+                        self.disk_hits += 1
+
+            self.misses += sum(1 for k in missing if k not in found)
+
+        return {key: vector.tolist() for key, vector in found.items()}
+
+    def put_many(self, items: dict[str, list[float]]) -> dict[str, list[float]]:
+        """
+        Store freshly computed embeddings in both tiers.
+
+        Returns the vectors as stored (float32-rounded), i.e. exactly what a
+        later cache hit will return.
+        """
+        stored: dict[str, list[float]] = {}
+        with self._lock:
+            rows = []
+            for key, embedding in items.items():
+                vector = array("f", embedding)
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes()))
+                stored[key] = vector.tolist()
+
+            db = self._get_db()
+            if db is not None and rows:
+                # INSERT OR REPLACE assigns a fresh rowid, so rowid order is write order
+                db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows
+                )
+                self._disk_items += len(rows)
+                if self._disk_items > self.max_disk_items:
+                    self._evict_disk(db)
+                db.commit()
+        return stored
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((lookups - self.misses) / lookups, 4) if lookups else 0.0,
+            "memory_items": len(self._lru),
+            "max_memory_items": self.max_items,
+            "max_disk_items": self.max_disk_items,
+            "disk_path": self.path or None
+        }
+
+
+_cache: Optional[EmbeddingCache] = None
+
+
+def get_cache() -> EmbeddingCache:
+    """Get or create the embedding cache."""
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache(EMBED_CACHE_SIZE, EMBED_CACHE_PATH or None)
+    return _cache
+
+
+def get_cache_stats() -> dict:
+    """Hit/miss counters for the embedding cache."""
+    return get_cache().stats()
+
+
+def _embed_cached(texts: list[str], input_type: str) -> list[list[float]]:
+    """Serve embeddings from cache; call the API only for (deduplicated) misses."""
+    cache = get_cache()
+    keys = [EmbeddingCache.key(text, input_type) for text in texts]
+    found = cache.get_many(keys)
+
+    # Unique missing texts, in first-seen order
+    missing = {key: text for key, text in zip(keys, texts) if key not in found}
+    if missing:
+        embeddings = _embed_batched(list(missing.values()), input_type)
+        # Same float32 values a later hit returns
+        found.update(cache.put_many(dict(zip(missing.keys(), embeddings))))
+
+    return [found[key] for key in keys]
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EMBEDDING API
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _embed_batch(texts: list[str], input_type: str) -> list[list[float]]:
+    """Single Cohere embed request (len(texts) <= EMBED_BATCH_SIZE)."""
+    client = get_client()
+    response = client.embed(
+        texts=texts,
+        model=MODEL_NAME,
+        input_type=input_type,
+        truncate="END"
+    )
+    return response.embeddings
+
+
+def _embed_batched(texts: list[str], input_type: str) -> list[list[float]]:
+    """Split into provider-sized batches and embed them concurrently, in order."""
+    batches = [
+        texts[i:i + EMBED_BATCH_SIZE]
+        for i in range(0, len(texts), EMBED_BATCH_SIZE)
+    ]
+    
+    if len(batches) == 1:
+        return _embed_batch(batches[0], input_type)
+    
+    get_client()  # Initialize once before worker threads share it
+    
+    # map() yields results in submission order, so output order == input order
+    workers = min(EMBED_MAX_WORKERS, len(batches))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda batch: _embed_batch(batch, input_type), batches)
+        return [embedding for batch in results for embedding in batch]
+
+
 def embed_texts(texts: list[str]) -> list[list[float]]:
     """
     Generate embeddings for a list of texts using Cohere API.
     
+    Cached embeddings are reused; misses larger than EMBED_BATCH_SIZE are
+    split into batches that run concurrently (up to EMBED_MAX_WORKERS).
+    
     Args:
         texts: List of strings to embed
         
     Returns:
-        List of 384-dimensional float vectors
+        List of 384-dimensional float vectors, in input order
     """
     if not texts:
         return []
     
-    client = get_client()
-    
-    # Cohere API call - much faster than local model
-    response = client.embed(
-        texts=texts,
-        model=MODEL_NAME,
-        input_type="search_document",  # For documents being stored
-        truncate="END"
-    )
-    
-    return response.embeddings
+    # For documents being stored
+    return _embed_cached(texts, input_type="search_document")
 
 
 def embed_query(text: str) -> list[float]:
     """Embed a query string (uses different input_type for better search)."""
-    client = get_client()
-    response = client.embed(
-        texts=[text],
-        model=MODEL_NAME,
-        input_type="search_query",  # For search queries
-        truncate="END"
-    )
-    return response.embeddings[0]
+    return _embed_cached([text], input_type="search_query")[0]
+
+
+def embed_queries(texts: list[str]) -> list[list[float]]:
+    """Embed several query strings in one (cached, batched) call."""
+    if not texts:
+        return []
+    return _embed_cached(texts, input_type="search_query")
 
 
 def embed_text(text: str) -> list[float]:
     """Embed a single text string (document)."""
     return embed_texts([text])[0]
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# QUERY MICRO-BATCHING
+# ═══════════════════════════════════════════════════════════════════════════
+
+class QueryEmbeddingBatcher:
+    """
+    Coalesces concurrent query embeddings into single embed requests.
+    
+    The first query in an empty batch starts a timer; the batch is sent
+    when the timer fires or when it reaches max_batch, whichever is first.
+    Bound to the event loop it was created on.
+    """
+
+    def __init__(self, window_ms: float, max_batch: int):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.loop = asyncio.get_running_loop()
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()  # Keep in-flight batches alive
+        self.batches = 0
+        self.queries = 0
+
+    async def embed(self, text: str) -> list[float]:
+        future = self.loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = self.loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self.loop.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.queries += len(batch)
+        try:
+            vectors = await asyncio.to_thread(embed_queries, [text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():  # Caller may have been cancelled
+                future.set_result(vector)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch_size": round(self.queries / self.batches, 2) if self.batches else 0.0
+        }
+
+
+_batcher: Optional[QueryEmbeddingBatcher] = None
+
+
+async def embed_query_async(text: str) -> list[float]:
+    """
+    Embed a query without blocking the event loop, coalescing with other
+    queries that arrive within EMBED_QUERY_WINDOW_MS.
+    """
+    global _batcher
+    if EMBED_QUERY_WINDOW_MS <= 0:
+        return await asyncio.to_thread(embed_query, text)
+    if _batcher is None or _batcher.loop is not asyncio.get_running_loop():
+        _batcher = QueryEmbeddingBatcher(EMBED_QUERY_WINDOW_MS, EMBED_QUERY_MAX_BATCH)
+    return await _batcher.embed(text)
+
+
+def get_batcher_stats() -> dict:
+    """Coalescing counters for embed_query_async."""
+    return _batcher.stats() if _batcher else {"batches": 0, "queries": 0, "avg_batch_size": 0.0}
@@ -10,11 +10,15 @@ Design choices:
 - Minimal dependencies (no OCR, no complex parsing)
 - Graceful fallbacks for encoding issues
 - Returns clean text ready for chunking
+- Streaming: iter_text() yields text page-by-page / block-by-block so the
+  ingest pipeline never needs the whole document as one string
 """
 
+import codecs
 import io
+import re
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
 # File size limit: 10MB (reasonable for demo, prevents memory issues)
 MAX_FILE_SIZE_MB = 10
@@ -23,6 +27,9 @@ MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
 # Supported extensions
 SUPPORTED_EXTENSIONS = {".txt", ".pdf", ".docx"}
 
+# Block size for incremental .txt decoding
+TEXT_BLOCK_BYTES = 64 * 1024
+
 
 class FileExtractionError(Exception):
     """Raised when file extraction fails."""
@@ -65,21 +72,35 @@ def validate_file(filename: str, file_size: int) -> str:
     return ext
 
 
-def extract_text_from_txt(content: bytes) -> str:
-    """Extract text from .txt file with encoding fallback."""
-    # Try UTF-8 first, then latin-1 (accepts any byte)
-    for encoding in ["utf-8", "latin-1"]:
-        try:
-            return content.decode(encoding)
-        except UnicodeDecodeError:
-            continue
-    
-    raise FileExtractionError("Could not decode text file")
+def _is_valid_utf8(content: bytes) -> bool:
+    """Validate UTF-8 block-by-block without materializing the decoded text."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        for i in range(0, len(content), TEXT_BLOCK_BYTES):
+            decoder.decode(content[i:i + TEXT_BLOCK_BYTES])
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
 
 
-def extract_text_from_pdf(content: bytes) -> str:
+def iter_text_from_txt(content: bytes) -> Iterator[str]:
+    """Yield decoded .txt blocks (UTF-8, falling back to latin-1)."""
+    # latin-1 accepts any byte, so it is the only fallback needed
+    encoding = "utf-8" if _is_valid_utf8(content) else "latin-1"
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for i in range(0, len(content), TEXT_BLOCK_BYTES):
+        block = decoder.decode(content[i:i + TEXT_BLOCK_BYTES])
+        if block:
+            yield block
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_text_from_pdf(content: bytes) -> Iterator[str]:
     """
-    Extract text from PDF using PyMuPDF.
+    Yield text page-by-page from a PDF using PyMuPDF.
     
     Note: Only extracts text, no OCR for scanned documents.
     """
@@ -93,30 +114,32 @@ def extract_text_from_pdf(content: bytes) -> str:
     try:
         # Open PDF from bytes
         doc = fitz.open(stream=content, filetype="pdf")
-        
-        text_parts = []
-        for page_num, page in enumerate(doc):
-            page_text = page.get_text()
+    except Exception as e:
+        raise FileExtractionError(f"PDF extraction failed: {str(e)}")
+    
+    try:
+        found_text = False
+        for page in doc:
+            try:
+                page_text = page.get_text()
+            except Exception as e:
+                raise FileExtractionError(f"PDF extraction failed: {str(e)}")
             if page_text.strip():
-                text_parts.append(page_text)
+                if found_text:
+                    yield "\n\n"
+                found_text = True
+                yield page_text
         
-        doc.close()
-        
-        if not text_parts:
+        if not found_text:
             raise FileExtractionError(
                 "No text found in PDF. May be scanned/image-based."
             )
-        
-        return "\n\n".join(text_parts)
-    
-    except Exception as e:
-        if isinstance(e, FileExtractionError):
-            raise
-        raise FileExtractionError(f"PDF extraction failed: {str(e)}")
+    finally:
+        doc.close()
 
 
-def extract_text_from_docx(content: bytes) -> str:
-    """Extract text from DOCX using python-docx."""
+def iter_text_from_docx(content: bytes) -> Iterator[str]:
+    """Yield paragraph and table-row text from DOCX using python-docx."""
     try:
         from docx import Document
     except ImportError:
@@ -127,11 +150,13 @@ def extract_text_from_docx(content: bytes) -> str:
     try:
         # Open DOCX from bytes
         doc = Document(io.BytesIO(content))
-        
-        text_parts = []
+    except Exception as e:
+        raise FileExtractionError(f"DOCX extraction failed: {str(e)}")
+    
+    def parts() -> Iterator[str]:
         for para in doc.paragraphs:
             if para.text.strip():
-                text_parts.append(para.text)
+                yield para.text
         
         # Also extract text from tables
         for table in doc.tables:
@@ -140,53 +165,104 @@ def extract_text_from_docx(content: bytes) -> str:
                     cell.text.strip() for cell in row.cells if cell.text.strip()
                 )
                 if row_text:
-                    text_parts.append(row_text)
-        
-        if not text_parts:
-            raise FileExtractionError("No text found in DOCX file.")
-        
-        return "\n\n".join(text_parts)
+                    yield row_text
     
+    found_text = False
+    try:
+        for part in parts():
+            if found_text:
+                yield "\n\n"
+            found_text = True
+            yield part
+    except FileExtractionError:
+        raise
     except Exception as e:
-        if isinstance(e, FileExtractionError):
-            raise
         raise FileExtractionError(f"DOCX extraction failed: {str(e)}")
+    
+    if not found_text:
+        raise FileExtractionError("No text found in DOCX file.")
 
 
-def extract_text(filename: str, content: bytes) -> str:
+def extract_text_from_txt(content: bytes) -> str:
+    """Extract text from .txt file with encoding fallback."""
+    return "".join(iter_text_from_txt(content))
+
+
+def extract_text_from_pdf(content: bytes) -> str:
+    """Extract text from PDF using PyMuPDF."""
+    return "".join(iter_text_from_pdf(content))
+
+
+def extract_text_from_docx(content: bytes) -> str:
+    """Extract text from DOCX using python-docx."""
+    return "".join(iter_text_from_docx(content))
+
+
+def _clean_stream(pieces: Iterable[str]) -> Iterator[str]:
     """
-    Extract text from file based on extension.
+    Strip and collapse whitespace across a stream of text pieces.
     
-    Args:
-        filename: Original filename (used to detect type)
-        content: Raw file bytes
-        
-    Returns:
-        Extracted text string
+    Trailing whitespace of each piece is held back and joined to the next,
+    so runs that straddle piece boundaries collapse exactly as they would
+    on the concatenated text.
+    """
+    pending = ""
+    started = False
+    for piece in pieces:
+        text = pending + piece
+        if not started:
+            text = text.lstrip()
+            if not text:
+                continue
+            started = True
         
+        body = text.rstrip()
+        pending = text[len(body):]
+        if body:
+            body = re.sub(r'\n{3,}', '\n\n', body)  # Max 2 newlines
+            body = re.sub(r' {2,}', ' ', body)       # Max 1 space
+            yield body
+    # Trailing whitespace of the whole document is dropped (strip)
+
+
+def iter_text(filename: str, content: bytes) -> Iterator[str]:
+    """
+    Stream cleaned text from a file, piece by piece.
+    
+    Concatenating the pieces gives exactly extract_text(filename, content).
+    Extraction errors are raised lazily while iterating.
+    
     Raises:
+        UnsupportedFileTypeError: If file type not supported (raised eagerly)
         FileExtractionError: If extraction fails
     """
     ext = Path(filename).suffix.lower()
     
     extractors = {
-        ".txt": extract_text_from_txt,
-        ".pdf": extract_text_from_pdf,
-        ".docx": extract_text_from_docx,
+        ".txt": iter_text_from_txt,
+        ".pdf": iter_text_from_pdf,
+        ".docx": iter_text_from_docx,
     }
     
     extractor = extractors.get(ext)
     if not extractor:
         raise UnsupportedFileTypeError(f"No extractor for: {ext}")
     
-    text = extractor(content)
-    
-    # Clean up text
-    text = text.strip()
-    
-    # Remove excessive whitespace
-    import re
-    text = re.sub(r'\n{3,}', '\n\n', text)  # Max 2 newlines
-    text = re.sub(r' {2,}', ' ', text)       # Max 1 space
+    return _clean_stream(extractor(content))
+
+
+def extract_text(filename: str, content: bytes) -> str:
+    """
+    Extract text from file based on extension.
     
-    return text
+    Args:
+        filename: Original filename (used to detect type)
+        content: Raw file bytes
+        
+    Returns:
+        Extracted text string
+        
+    Raises:
+        FileExtractionError: If extraction fails
+    """
+    return "".join(iter_text(filename, content))
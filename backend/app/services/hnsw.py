@@ -0,0 +1,300 @@
+"""
+HNSW approximate nearest-neighbour index (NumPy).
+
+Hierarchical Navigable Small World graph (Malkov & Yashunin) used by the
+local vector backend once exact brute-force search stops scaling.
+
+Design choices:
+- Cosine similarity on normalized float32 vectors (distance = 1 - dot)
+- Distances to a node's whole neighbour list are computed in one
+  vectorized matmul; the graph walk itself is plain Python
+- Neighbour selection uses the paper's heuristic (keep a candidate only if
+  it is closer to the new node than to any neighbour already kept), which
+  preserves recall on clustered data
+- Deletes are tombstones: deleted nodes still route searches but are never
+  returned. compact() rebuilds from live nodes when tombstones pile up
+- Re-adding a label tombstones the old node and inserts a new one
+
+Tuning:
+- M: links per node (2*M on layer 0). Higher = better recall, more memory
+- ef_construction: candidate list size while inserting (build quality)
+- ef_search: candidate list size while querying (recall vs latency)
+
+Not thread-safe on its own; NumpyIndex serializes access with its lock.
+See benchmarks/bench_hnsw.py for recall vs latency against exact search.
+"""
+
+from __future__ import annotations
+import heapq
+import json
+import math
+import os
+import random
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+
+class HNSWIndex:
+    """Incremental HNSW graph over string labels (chunk IDs)."""
+
+    def __init__(
+        self,
+        dimension: int,
+        M: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 64,
+        seed: int = 42
+    ):
+        self.dimension = dimension
+        self.M = M
+        self.M0 = 2 * M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._ml = 1 / math.log(M)
+        self._rng = random.Random(seed)
+
+        self._vectors = np.empty((1024, dimension), dtype=np.float32)
+        self._count = 0
+        self._levels: list[int] = []
+        self._links: list[list[list[int]]] = []    # node → level → neighbours
+        self._labels: list[str] = []
+        self._label_to_node: dict[str, int] = {}
+        self._deleted: set[int] = set()
+        self._entry = -1
+        self._max_level = -1
+
+    def __len__(self) -> int:
+        """Number of live (non-deleted) labels."""
+        return len(self._label_to_node)
+
+    @property
+    def tombstones(self) -> int:
+        return len(self._deleted)
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Graph primitives
+    # ─────────────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        return v / max(float(np.linalg.norm(v)), 1e-12)
+
+    def _distances(self, query: np.ndarray, nodes: list[int]) -> list[float]:
+        return (1.0 - self._vectors[nodes] @ query).tolist()
+
+    def _search_layer(
+        self,
+        query: np.ndarray,
+        entry_points: list[int],
+        ef: int,
+        level: int
+    ) -> list[tuple[float, int]]:
+        """Best-first search on one layer; returns up to ef (distance, node), closest first."""
+        visited = set(entry_points)
+        candidates = list(zip(self._distances(query, entry_points), entry_points))
+        heapq.heapify(candidates)
+        results = [(-d, n) for d, n in candidates]    # max-heap on distance
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            dist, node = heapq.heappop(candidates)
+            if dist > -results[0][0] and len(results) >= ef:
+                break
+
+            neighbours = [n for n in self._links[node][level] if n not in visited]
+            if not neighbours:
+                continue
+            visited.update(neighbours)
+
+            bound = -results[0][0]
+            for d, n in zip(self._distances(query, neighbours), neighbours):
+                if len(results) < ef or d < bound:
+                    heapq.heappush(candidates, (d, n))
+                    heapq.heappush(results, (-d, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+                    bound = -results[0][0]
+
+        return sorted((-d, n) for d, n in results)
+
+    def _select_neighbours(self, candidates: list[tuple[float, int]], m: int) -> list[int]:
+        """Heuristic selection from (distance, node) pairs sorted closest first."""
+        selected: list[int] = []
+        for dist, node in candidates:
+            if len(selected) >= m:
+                break
+            if selected:
+                to_selected = 1.0 - self._vectors[selected] @ self._vectors[node]
+                if float(to_selected.min()) < dist:
+                    continue
+            selected.append(node)
+        return selected
+
+    def _greedy_descend(self, query: np.ndarray, to_level: int) -> list[int]:
+        """Walk from the entry point down to to_level (exclusive) with ef=1."""
+        entry = [self._entry]
+        for level in range(self._max_level, to_level, -1):
+            entry = [self._search_layer(query, entry, 1, level)[0][1]]
+        return entry
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Public API
+    # ─────────────────────────────────────────────────────────────────────
+
+    def add(self, label: str, vector) -> None:
+        """Insert a vector (re-adding a label replaces it)."""
+        if label in self._label_to_node:
+            self.mark_deleted(label)
+
+        query = self._normalize(vector)
+        node = self._count
+        if node == len(self._vectors):
+            grown = np.empty((2 * len(self._vectors), self.dimension), dtype=np.float32)
+            grown[:node] = self._vectors[:node]
+            self._vectors = grown
+        self._vectors[node] = query
+        self._count += 1
+
+        level = int(-math.log(1.0 - self._rng.random()) * self._ml)
+        self._levels.append(level)
+        self._links.append([[] for _ in range(level + 1)])
+        self._labels.append(label)
+        self._label_to_node[label] = node
+
+        if self._entry == -1:
+            self._entry, self._max_level = node, level
+            return
+
+        entry = self._greedy_descend(query, level)
+        for lvl in range(min(level, self._max_level), -1, -1):
+            found = self._search_layer(query, entry, self.ef_construction, lvl)
+            neighbours = self._select_neighbours(found, self.M)
+            self._links[node][lvl] = neighbours
+
+            m_max = self.M0 if lvl == 0 else self.M
+            for other in neighbours:
+                links = self._links[other][lvl]
+                links.append(node)
+                if len(links) > m_max:
+                    dists = self._distances(self._vectors[other], links)
+                    self._links[other][lvl] = self._select_neighbours(
+                        sorted(zip(dists, links)), m_max
+                    )
+            entry = [n for _, n in found]
+
+        if level > self._max_level:
+            self._entry, self._max_level = node, level
+
+    def mark_deleted(self, label: str) -> bool:
+        """Tombstone a label. Returns False if it wasn't present."""
+        node = self._label_to_node.pop(label, None)
+        if node is None:
+            return False
+        self._deleted.add(node)
+        return True
+
+    def search(
+        self,
+        vector,
+        k: int = 10,
+        ef: Optional[int] = None
+    ) -> list[tuple[str, float]]:
+        """Approximate top-k as (label, cosine similarity), best first."""
+        if not self._label_to_node:
+            return []
+
+        query = self._normalize(vector)
+        entry = self._greedy_descend(query, 0)
+        # Widen the beam in proportion to the tombstone fraction: with half the
+        # nodes deleted, about half of any candidate list is unusable
+        ef = max(ef or self.ef_search, k)
+        if self._deleted:
+            ef = min(math.ceil(ef * self._count / len(self._label_to_node)), self._count)
+        found = self._search_layer(query, entry, ef, 0)
+
+        results = []
+        for dist, node in found:
+            if node in self._deleted:
+                continue
+            results.append((self._labels[node], 1.0 - dist))
+            if len(results) == k:
+                break
+        return results
+
+    def compact(self) -> None:
+        """Rebuild the graph from live nodes, dropping tombstones."""
+        live = sorted(self._label_to_node.items(), key=lambda item: item[1])
+        vectors = self._vectors[[node for _, node in live]] if live else None
+        self.__init__(self.dimension, self.M, self.ef_construction, self.ef_search)
+        for i, (label, _) in enumerate(live):
+            self.add(label, vectors[i])
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Persistence
+    # ─────────────────────────────────────────────────────────────────────
+
+    def save(self, path: str | Path) -> None:
+        """Write the graph to a single .npz file (atomic replace)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Links are flattened in (node, level) order; levels give the shape back
+        counts = [len(nbrs) for node_links in self._links for nbrs in node_links]
+        flat = [n for node_links in self._links for nbrs in node_links for n in nbrs]
+        header = {
+            "dimension": self.dimension, "M": self.M,
+            "ef_construction": self.ef_construction, "ef_search": self.ef_search,
+            "entry": self._entry, "max_level": self._max_level,
+            "labels": self._labels
+        }
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp,
+            header=np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8),
+            vectors=self._vectors[:self._count],
+            levels=np.asarray(self._levels, dtype=np.int32),
+            link_counts=np.asarray(counts, dtype=np.int32),
+            links=np.asarray(flat, dtype=np.int32),
+            deleted=np.asarray(sorted(self._deleted), dtype=np.int64)
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> HNSWIndex:
+        """Load a graph written by save()."""
+        with np.load(path) as data:
+            header = json.loads(data["header"].tobytes().decode("utf-8"))
+            index = cls(
+                header["dimension"], header["M"],
+                header["ef_construction"], header["ef_search"]
+            )
+            vectors = data["vectors"]
+            levels = data["levels"].tolist()
+            counts = iter(data["link_counts"].tolist())
+            flat = data["links"].tolist()
+            deleted = set(data["deleted"].tolist())
+
+        index._vectors = np.empty((max(len(vectors), 1024), index.dimension), dtype=np.float32)
+        index._vectors[:len(vectors)] = vectors
+        index._count = len(vectors)
+        index._levels = levels
+        pos = 0
+        for level in levels:
+            node_links = []
+            for _ in range(level + 1):
+                n = next(counts)
+                node_links.append(flat[pos:pos + n])
+                pos += n
+            index._links.append(node_links)
+        index._labels = header["labels"]
+        index._deleted = deleted
+        index._label_to_node = {
+            label: node for node, label in enumerate(index._labels) if node not in deleted
+        }
+        index._entry = header["entry"]
+        index._max_level = header["max_level"]
+        return index
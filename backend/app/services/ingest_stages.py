@@ -0,0 +1,190 @@
+"""
+Staged ingest: Chunk → Embed → Upsert with bounded queues.
+
+Why:
+- Embedding (Cohere) and upserting (Pinecone) are both network-bound.
+  Run back to back, their latencies add up; run as concurrent stages,
+  batch N+1 is embedding while batch N is upserting, and wall-clock time
+  approaches the slower stage
+
+Flow:
+    caller thread          embed workers            upsert workers
+    chunks → batches ──► [embed_q] ──► vectors ──► [upsert_q] ──► index
+
+Backpressure:
+- Both queues are bounded (INGEST_QUEUE_SIZE batches). A slow stage blocks
+  the one before it, so at most ~(2 * queue size + workers) batches of
+  chunks/embeddings are in memory, however large the document
+
+Errors:
+- The first exception in any stage stops the pipeline and is re-raised
+  in the caller after all workers exit
+"""
+
+from __future__ import annotations
+import os
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+
+# Chunks per embed request (Cohere max 96 texts) and per-stage concurrency
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "96"))
+INGEST_EMBED_WORKERS = int(os.getenv("INGEST_EMBED_WORKERS", "4"))
+INGEST_UPSERT_WORKERS = int(os.getenv("INGEST_UPSERT_WORKERS", "2"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "4"))
+
+_DONE = object()  # Sentinel: no more batches
+
+
+@dataclass
+class IngestStats:
+    """What the stages produced."""
+    doc_id: Optional[str] = None
+    chunk_ids: list[str] = field(default_factory=list)
+    created_at: Optional[str] = None
+    title: Optional[str] = None
+    upserted_count: int = 0
+
+
+class _Stopped(Exception):
+    """Internal: another stage failed, stop waiting."""
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> None:
+    """Blocking put that gives up if the pipeline is stopping."""
+    while True:
+        if stop.is_set():
+            raise _Stopped()
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    """Blocking get that gives up if the pipeline is stopping."""
+    while True:
+        if stop.is_set():
+            raise _Stopped()
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+
+
+def run_ingest_stages(
+    chunks: Iterable,
+    batch_size: int = INGEST_BATCH_SIZE,
+    embed_workers: int = INGEST_EMBED_WORKERS,
+    upsert_workers: int = INGEST_UPSERT_WORKERS,
+    queue_size: int = INGEST_QUEUE_SIZE,
+    on_progress: Optional[Callable[[int], None]] = None
+) -> IngestStats:
+    """
+    Embed and upsert chunks through concurrent, bounded stages.
+
+    Args:
+        chunks: Iterable of Chunk objects (may be a lazy generator)
+        batch_size: Chunks per embed call
+        embed_workers: Concurrent embed requests
+        upsert_workers: Concurrent upsert requests
+        queue_size: Max batches waiting between stages (backpressure)
+        on_progress: Called with the running upserted-chunk count
+
+    Returns:
+        IngestStats with doc_id, chunk IDs and upserted count
+    """
+    from .embedder import embed_texts
+    from .vector_store import build_vectors, upsert_vectors
+
+    embed_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    upsert_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors: list[BaseException] = []
+    stats = IngestStats()
+    count_lock = threading.Lock()
+
+    def fail(e: BaseException) -> None:
+        if not errors:
+            errors.append(e)
+        stop.set()
+
+    def embed_worker() -> None:
+        try:
+            while True:
+                batch = _get(embed_q, stop)
+                if batch is _DONE:
+                    return
+                embeddings = embed_texts([chunk.text for chunk in batch])
+                _put(upsert_q, build_vectors(batch, embeddings), stop)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            fail(e)
+
+    def upsert_worker() -> None:
+        try:
+            while True:
+                vectors = _get(upsert_q, stop)
+                if vectors is _DONE:
+                    return
+                upserted = upsert_vectors(vectors)
+                with count_lock:
+                    stats.upserted_count += upserted
+                    done = stats.upserted_count
+                if on_progress:
+                    on_progress(done)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            fail(e)
+
+    embedders = [
+        threading.Thread(target=embed_worker, name=f"ingest-embed-{i}", daemon=True)
+        for i in range(embed_workers)
+    ]
+    upserters = [
+        threading.Thread(target=upsert_worker, name=f"ingest-upsert-{i}", daemon=True)
+        for i in range(upsert_workers)
+    ]
+    for thread in embedders + upserters:
+        thread.start()
+
+    # Stage 1 (caller thread): chunk lazily, batch, feed the embedders
+    try:
+        batch = []
+        for chunk in chunks:
+            if stats.doc_id is None:
+                stats.doc_id = chunk.doc_id
+                stats.created_at = chunk.created_at
+                stats.title = chunk.metadata.get("title")
+            stats.chunk_ids.append(chunk.chunk_id)
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                _put(embed_q, batch, stop)
+                batch = []
+        if batch:
+            _put(embed_q, batch, stop)
+        for _ in embedders:
+            _put(embed_q, _DONE, stop)
+    except _Stopped:
+        pass
+    except BaseException as e:
+        fail(e)
+
+    # Drain: embedders finish, then tell the upserters
+    for thread in embedders:
+        thread.join()
+    try:
+        for _ in upserters:
+            _put(upsert_q, _DONE, stop)
+    except _Stopped:
+        pass
+    for thread in upserters:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return stats
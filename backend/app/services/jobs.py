@@ -0,0 +1,349 @@
+"""
+Background ingestion jobs (in-process queue, SQLite-persisted state).
+
+Why:
+- /upload extracts, chunks, embeds and upserts inside the HTTP request;
+  large PDFs hit client/proxy timeouts and hold a worker the whole time
+- With ?background=true the request only stores the payload and returns
+  a job_id; GET /jobs/{job_id} reports progress
+
+Design choices:
+- Bounded pool of JOB_WORKERS threads runs the same ingest_text /
+  ingest_stream used by the synchronous endpoints; at most JOB_MAX_QUEUED
+  jobs may wait or run at once (submit raises JobQueueFull beyond that)
+- Progress comes from the staged ingest pipeline's on_progress callback
+  (chunks stored so far)
+- Payloads (UTF-8 text or the uploaded file's bytes) are written under
+  DATA_DIR/jobs before the job is queued and removed when it finishes
+- doc_id is fixed at submit time, so a resumed job overwrites its own
+  partial chunks instead of creating a second document
+- On startup, jobs left queued/ingesting by a restart are re-queued when
+  JOB_RESUME is on and their payload survived (ingest is idempotent:
+  same doc_id → same chunk IDs), otherwise marked "interrupted"
+
+Stages: queued → ingesting → done | failed | interrupted
+"""
+
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+DATA_DIR = os.getenv("DATA_DIR", "data")
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(DATA_DIR, "jobs.sqlite3"))
+JOBS_DIR = os.getenv("JOBS_DIR", os.path.join(DATA_DIR, "jobs"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "100"))
+JOB_RESUME = os.getenv("JOB_RESUME", "true").lower() in ("1", "true", "yes")
+
+ACTIVE_STAGES = ("queued", "ingesting")
+
+
+class JobQueueFull(Exception):
+    """Raised when JOB_MAX_QUEUED jobs are already waiting or running."""
+    pass
+
+
+@dataclass
+class Job:
+    """State of one background ingest job."""
+    job_id: str
+    kind: str                   # "ingest" | "upload"
+    stage: str                  # queued | ingesting | done | failed | interrupted
+    chunks_processed: int
+    params: dict                # doc_id, metadata, filename...
+    created_at: str
+    updated_at: str
+    doc_id: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[dict] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "stage": self.stage,
+            "chunks_processed": self.chunks_processed,
+            "doc_id": self.doc_id,
+            "error": self.error,
+            "result": self.result,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobStore:
+    """SQLite table of jobs; every state change is committed immediately."""
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id           TEXT PRIMARY KEY,
+                    kind             TEXT NOT NULL,
+                    stage            TEXT NOT NULL,
+                    chunks_processed INTEGER NOT NULL DEFAULT 0,
+                    params           TEXT NOT NULL,
+                    doc_id           TEXT,
+                    error            TEXT,
+                    result           TEXT,
+                    created_at       TEXT NOT NULL,
+                    updated_at       TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_stage ON jobs (stage)")
+            self._conn.commit()
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Job:
+        return Job(
+            job_id=row["job_id"],
+            kind=row["kind"],
+            stage=row["stage"],
+            chunks_processed=row["chunks_processed"],
+            params=json.loads(row["params"]),
+            doc_id=row["doc_id"],
+            error=row["error"],
+            result=json.loads(row["result"]) if row["result"] else None,
+            created_at=row["created_at"],
+            updated_at=row["updated_at"]
+        )
+
+    def create(self, kind: str, params: dict) -> Job:
+        now = _now()
+        job = Job(
+            job_id=uuid4().hex,
+            kind=kind,
+            stage="queued",
+            chunks_processed=0,
+            params=params,
+            doc_id=params.get("doc_id"),
+            created_at=now,
+            updated_at=now
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, kind, stage, params, doc_id, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job.job_id, kind, job.stage, json.dumps(params), job.doc_id, now, now)
+            )
+            self._conn.commit()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def active(self) -> list[Job]:
+        """Jobs not yet finished, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE stage IN (?, ?) ORDER BY created_at", ACTIVE_STAGES
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def update(self, job_id: str, **fields) -> None:
+        """Set columns (stage, chunks_processed, doc_id, error, result)."""
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = json.dumps(fields["result"])
+        fields["updated_at"] = _now()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {columns} WHERE job_id = ?",
+                (*fields.values(), job_id)
+            )
+            self._conn.commit()
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# PAYLOADS
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _payload_path(job_id: str) -> Path:
+    return Path(JOBS_DIR) / f"{job_id}.bin"
+
+
+def _save_payload(job_id: str, data: bytes) -> None:
+    path = _payload_path(job_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)    # Never leave a half-written payload to resume from
+
+
+def _drop_payload(job_id: str) -> None:
+    _payload_path(job_id).unlink(missing_ok=True)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# RUNNERS
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _run_ingest(job: Job, payload: bytes, on_progress) -> dict:
+    from .pipeline import ingest_text
+
+    return ingest_text(
+        text=payload.decode("utf-8"),
+        doc_id=job.params.get("doc_id"),
+        metadata=job.params.get("metadata") or {},
+        on_progress=on_progress
+    )
+
+
+def _run_upload(job: Job, payload: bytes, on_progress) -> dict:
+    from .file_extractor import iter_text
+    from .pipeline import ingest_stream
+
+    return ingest_stream(
+        iter_text(job.params["filename"], payload),
+        doc_id=job.params.get("doc_id"),
+        metadata=job.params.get("metadata") or {},
+        on_progress=on_progress
+    )
+
+
+_RUNNERS = {"ingest": _run_ingest, "upload": _run_upload}
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# QUEUE
+# ═══════════════════════════════════════════════════════════════════════════
+
+class JobQueue:
+    """Bounded worker pool executing persisted jobs."""
+
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS, max_queued: int = JOB_MAX_QUEUED):
+        self.store = store
+        self.max_queued = max_queued
+        self._pool = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="job")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, params: dict, payload: bytes) -> Job:
+        """Persist the payload and job row, then queue it. Raises JobQueueFull."""
+        if kind not in _RUNNERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if not params.get("doc_id"):
+            params = {**params, "doc_id": f"doc_{uuid4().hex[:12]}"}
+        with self._lock:
+            if self._pending >= self.max_queued:
+                raise JobQueueFull(f"Too many pending jobs (max {self.max_queued})")
+            self._pending += 1
+        try:
+            job = self.store.create(kind, params)
+            _save_payload(job.job_id, payload)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        self._pool.submit(self._run, job)
+        return job
+
+    def _run(self, job: Job) -> None:
+        store = self.store
+        try:
+            payload = _payload_path(job.job_id).read_bytes()
+            store.update(job.job_id, stage="ingesting", chunks_processed=0, error=None)
+            result = _RUNNERS[job.kind](
+                job,
+                payload,
+                lambda done: store.update(job.job_id, chunks_processed=done)
+            )
+            if result.get("status") == "empty_text":
+                store.update(job.job_id, stage="failed", error="No text content found", result=result)
+            else:
+                store.update(
+                    job.job_id,
+                    stage="done",
+                    doc_id=result.get("doc_id"),
+                    chunks_processed=result.get("chunks_created", 0),
+                    result=result
+                )
+        except Exception as e:
+            print(f"⚠️ Job {job.job_id} failed: {e}")
+            store.update(job.job_id, stage="failed", error=str(e))
+        finally:
+            _drop_payload(job.job_id)
+            with self._lock:
+                self._pending -= 1
+
+    def recover(self, resume: bool = JOB_RESUME) -> tuple[int, int]:
+        """
+        Handle jobs left unfinished by a restart.
+
+        Returns:
+            (resumed, interrupted) counts
+        """
+        resumed = interrupted = 0
+        for job in self.store.active():
+            if resume and _payload_path(job.job_id).exists():
+                self.store.update(job.job_id, stage="queued", chunks_processed=0)
+                with self._lock:
+                    self._pending += 1
+                self._pool.submit(self._run, job)
+                resumed += 1
+            else:
+                self.store.update(
+                    job.job_id,
+                    stage="interrupted",
+                    error="Server restarted before the job finished"
+                )
+                _drop_payload(job.job_id)
+                interrupted += 1
+        return resumed, interrupted
+
+    def shutdown(self) -> None:
+        """Stop taking jobs; unfinished ones are recovered on next start."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Get or create the job queue."""
+    global _queue
+    if _queue is None:
+        _queue = JobQueue(JobStore())
+    return _queue
+
+
+def submit_job(kind: str, params: dict, payload: bytes) -> Job:
+    return get_job_queue().submit(kind, params, payload)
+
+
+def get_job(job_id: str) -> Optional[Job]:
+    return get_job_queue().store.get(job_id)
+
+
+def recover_jobs() -> None:
+    """Startup hook: resume or mark jobs a restart left unfinished."""
+    resumed, interrupted = get_job_queue().recover()
+    if resumed or interrupted:
+        print(f"✅ Jobs recovered: {resumed} resumed, {interrupted} marked interrupted")
+
+
+def shutdown_jobs() -> None:
+    """Shutdown hook (no-op if no job queue was created)."""
+    if _queue is not None:
+        _queue.shutdown()
@@ -15,16 +15,28 @@ NOTE: Lazy imports used to reduce startup memory for Render free tier.
 """
 
 from __future__ import annotations
+import asyncio
 import os
 import json
+import threading
+import time
 from dataclasses import dataclass
-from typing import Optional, TYPE_CHECKING
-from groq import Groq
+from typing import AsyncIterator, Optional, TYPE_CHECKING, Union
+from groq import AsyncGroq, Groq
 
 if TYPE_CHECKING:
     from .retriever import RetrievedChunk
 
 
+# Generation defaults (also part of the pipeline's answer cache key)
+LLM_MODEL = "llama-3.1-8b-instant"
+LLM_MAX_TOKENS = 1024
+LLM_TEMPERATURE = 0.1  # Low for factual accuracy
+
+# Requests per minute allowed by the Groq plan (free tier: 30)
+GROQ_RPM = int(os.getenv("GROQ_RPM", "30"))
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 # PROMPT TEMPLATE
 # ═══════════════════════════════════════════════════════════════════════════
@@ -99,49 +111,91 @@ class AnswerResponse:
 # ═══════════════════════════════════════════════════════════════════════════
 
 _client: Optional[Groq] = None
+_async_client: Optional[AsyncGroq] = None
+
+
+def _api_key() -> str:
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError("GROQ_API_KEY environment variable not set")
+    return api_key
 
 
 def get_client() -> Groq:
     """Get or create Groq client."""
     global _client
     if _client is None:
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError("GROQ_API_KEY environment variable not set")
-        _client = Groq(api_key=api_key)
+        _client = Groq(api_key=_api_key())
     return _client
 
 
-def generate_answer(
-    question: str,
-    chunks: list,
-    model: str = "llama-3.1-8b-instant",
-    max_tokens: int = 1024,
-    temperature: float = 0.1  # Low for factual accuracy
-) -> AnswerResponse:
+def get_async_client() -> AsyncGroq:
+    """Get or create the async Groq client (for the async request path)."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncGroq(api_key=_api_key())
+    return _async_client
+
+
+class RateLimiter:
     """
-    Generate an answer with inline citations from retrieved chunks.
+    Spaces requests to at most `rate` per `period` seconds.
     
-    Args:
-        question: User's question
-        chunks: Reranked chunks to use as context
-        model: Groq model name
-        max_tokens: Maximum response length
-        temperature: Sampling temperature (lower = more deterministic)
-        
-    Returns:
-        AnswerResponse with answer, citations, and metadata
+    Callers reserve the next free slot and sleep until it. The process-wide
+    instance (get_rate_limiter) is acquired inside every Groq call below, so
+    /query, /query/stream, /query/batch and the sync pipeline together stay
+    within GROQ_RPM (per process: each uvicorn worker has its own limiter).
     """
-    if not chunks:
-        return AnswerResponse(
-            answer="I cannot answer this question as no relevant documents were found.",
-            citations=[],
-            tokens_used=0,
-            model=model,
-            has_answer=False
-        )
-    
-    # Format context with numbered chunks
+    
+    def __init__(self, rate: int = GROQ_RPM, period: float = 60.0):
+        self.interval = period / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()   # Sync callers reserve from worker threads
+    
+    def _reserve(self) -> float:
+        """Reserve the next slot; returns seconds to wait for it."""
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        return slot - now
+    
+    async def acquire(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    def acquire_sync(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get or create the Groq request rate limiter."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
+
+
+def _no_context_response(model: str) -> AnswerResponse:
+    return AnswerResponse(
+        answer="I cannot answer this question as no relevant documents were found.",
+        citations=[],
+        tokens_used=0,
+        model=model,
+        has_answer=False
+    )
+
+
+def build_messages(question: str, chunks: list) -> list[dict]:
+    """Format numbered context chunks and the question as chat messages."""
     context_parts = []
     for i, chunk in enumerate(chunks, 1):
         title = chunk.metadata.get("title", "")
@@ -156,22 +210,19 @@ def generate_answer(
         question=question
     )
     
-    # Call Groq API
-    client = get_client()
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": user_prompt}
-        ],
-        max_tokens=max_tokens,
-        temperature=temperature
-    )
-    
-    answer = response.choices[0].message.content.strip()
-    tokens_used = response.usage.total_tokens
-    
-    # Build citation objects
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def build_answer_response(
+    answer: str,
+    tokens_used: int,
+    chunks: list,
+    model: str
+) -> AnswerResponse:
+    """Attach citations and detect "no answer" responses."""
     citations = []
     for i, chunk in enumerate(chunks, 1):
         citations.append(Citation(
@@ -202,6 +253,121 @@ def generate_answer(
     )
 
 
+def generate_answer(
+    question: str,
+    chunks: list,
+    model: str = LLM_MODEL,
+    max_tokens: int = LLM_MAX_TOKENS,
+    temperature: float = LLM_TEMPERATURE
+) -> AnswerResponse:
+    """
+    Generate an answer with inline citations from retrieved chunks.
+    
+    Args:
+        question: User's question
+        chunks: Reranked chunks to use as context
+        model: Groq model name
+        max_tokens: Maximum response length
+        temperature: Sampling temperature (lower = more deterministic)
+        
+    Returns:
+        AnswerResponse with answer, citations, and metadata
+    """
+    if not chunks:
+        return _no_context_response(model)
+    
+    # Call Groq API
+    get_rate_limiter().acquire_sync()
+    client = get_client()
+    response = client.chat.completions.create(
+        model=model,
+        messages=build_messages(question, chunks),
+        max_tokens=max_tokens,
+        temperature=temperature
+    )
+    
+    return build_answer_response(
+        answer=response.choices[0].message.content.strip(),
+        tokens_used=response.usage.total_tokens,
+        chunks=chunks,
+        model=model
+    )
+
+
+async def generate_answer_async(
+    question: str,
+    chunks: list,
+    model: str = LLM_MODEL,
+    max_tokens: int = LLM_MAX_TOKENS,
+    temperature: float = LLM_TEMPERATURE
+) -> AnswerResponse:
+    """Async generate_answer: awaits Groq without blocking the event loop."""
+    if not chunks:
+        return _no_context_response(model)
+    
+    await get_rate_limiter().acquire()
+    client = get_async_client()
+    response = await client.chat.completions.create(
+        model=model,
+        messages=build_messages(question, chunks),
+        max_tokens=max_tokens,
+        temperature=temperature
+    )
+    
+    return build_answer_response(
+        answer=response.choices[0].message.content.strip(),
+        tokens_used=response.usage.total_tokens,
+        chunks=chunks,
+        model=model
+    )
+
+
+async def stream_answer_async(
+    question: str,
+    chunks: list,
+    model: str = LLM_MODEL,
+    max_tokens: int = LLM_MAX_TOKENS,
+    temperature: float = LLM_TEMPERATURE
+) -> AsyncIterator[Union[str, AnswerResponse]]:
+    """
+    Stream the answer: yields text deltas as Groq produces them, then one
+    final AnswerResponse (full answer, citations, usage, has_answer).
+    """
+    if not chunks:
+        yield _no_context_response(model)
+        return
+    
+    await get_rate_limiter().acquire()
+    client = get_async_client()
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=build_messages(question, chunks),
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stream=True
+    )
+    
+    parts: list[str] = []
+    tokens_used = 0
+    async for event in stream:
+        if event.choices:
+            delta = event.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+        # Groq reports usage on the last chunk (x_groq.usage or usage)
+        usage = getattr(event, "usage", None) or getattr(getattr(event, "x_groq", None), "usage", None)
+        if usage is not None:
+            tokens_used = usage.total_tokens
+    
+    yield build_answer_response(
+        answer="".join(parts).strip(),
+        tokens_used=tokens_used,
+        chunks=chunks,
+        model=model
+    )
+
+
 def answer_question(
     question: str,
     retrieve_k: int = 20,
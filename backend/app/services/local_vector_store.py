@@ -0,0 +1,347 @@
+"""
+In-process vector store (NumPy exact search, optional HNSW).
+
+Drop-in for the Pinecone index used by vector_store.py, selected with
+VECTOR_BACKEND=local. Useful offline, in benchmarks, and for small corpora
+where the network hop to Pinecone dominates query latency.
+
+Storage:
+- Normalized float32 embeddings in one contiguous (capacity x dim) matrix,
+  grown by doubling
+- Parallel lists of ids / metadata, plus doc_id → rows for filtered search
+- Persisted to LOCAL_INDEX_DIR (vectors.npy + meta.json) by flush(), once
+  per ingest or delete call (vector_store.flush_index), not per upsert
+  batch: rewriting the full matrix every 100 vectors made ingest O(N²) I/O
+
+Search:
+- Cosine similarity = one BLAS matmul against the normalized matrix
+- Top-k via np.argpartition (O(n)), then sort only the k winners
+- About a millisecond per ~10K chunks; fine up to a few hundred thousand
+
+Approximate search (LOCAL_INDEX_TYPE=hnsw):
+- Unfiltered queries go through an HNSW graph (hnsw.py) kept in sync on
+  upsert (incremental insert; overwrites tombstone the old node) and delete
+  (tombstones), saved as hnsw.npz; both compact the graph once tombstones
+  outnumber live nodes, so repeated re-ingests don't grow it
+- doc_id-filtered queries stay exact over that document's rows
+- Tunables: HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH
+
+Only the subset of the Pinecone Index API that vector_store.py uses is
+implemented (upsert, query, fetch, list, delete, describe_index_stats), plus
+flush() for persistence.
+"""
+
+from __future__ import annotations
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+from .hnsw import HNSWIndex
+
+DATA_DIR = os.getenv("DATA_DIR", "data")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", os.path.join(DATA_DIR, "local_index"))
+
+# "exact" (brute force) or "hnsw" (approximate, for millions of chunks)
+LOCAL_INDEX_TYPE = os.getenv("LOCAL_INDEX_TYPE", "exact").lower()
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "100"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+# Rebuild the graph once tombstones outnumber live nodes
+HNSW_MAX_TOMBSTONE_RATIO = 1.0
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# RESULT TYPES (mirror the attributes read from Pinecone responses)
+# ═══════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class Match:
+    id: str
+    score: float
+    metadata: dict
+    values: list[float] = field(default_factory=list)
+
+
+@dataclass
+class QueryResult:
+    matches: list[Match]
+
+
+@dataclass
+class UpsertResult:
+    upserted_count: int
+
+
+@dataclass
+class IndexStats:
+    total_vector_count: int
+
+
+@dataclass
+class FetchResult:
+    vectors: dict[str, Match]
+
+
+def _filter_doc_id(filter: Optional[dict]) -> Optional[str]:
+    """Support the only filter shape used by vector_store: {"doc_id": {"$eq": x}}."""
+    if not filter:
+        return None
+    try:
+        return filter["doc_id"]["$eq"]
+    except (KeyError, TypeError):
+        raise ValueError(f"Unsupported filter for local index: {filter}")
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# INDEX
+# ═══════════════════════════════════════════════════════════════════════════
+
+class NumpyIndex:
+    """Cosine-similarity index over a contiguous float32 matrix (+ optional HNSW)."""
+
+    def __init__(
+        self,
+        dimension: int,
+        path: Optional[str] = LOCAL_INDEX_DIR,
+        index_type: str = LOCAL_INDEX_TYPE
+    ):
+        self.dimension = dimension
+        self.path = Path(path) if path else None
+        self.index_type = index_type
+        self._hnsw: Optional[HNSWIndex] = None
+        self._lock = threading.RLock()
+        self._vectors = np.empty((1024, dimension), dtype=np.float32)
+        self._count = 0
+        self._ids: list[str] = []
+        self._metadata: list[dict] = []
+        self._rows: dict[str, int] = {}              # id → row
+        self._doc_rows: dict[str, set[int]] = {}     # doc_id → rows
+        self._dirty = False                          # Changed since the last flush
+        self._load()
+        if index_type == "hnsw" and self._hnsw is None:
+            self._build_hnsw()
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Persistence
+    # ─────────────────────────────────────────────────────────────────────
+
+    def _build_hnsw(self) -> None:
+        """Create the graph (from existing vectors when switching from exact)."""
+        self._hnsw = HNSWIndex(
+            self.dimension,
+            M=HNSW_M,
+            ef_construction=HNSW_EF_CONSTRUCTION,
+            ef_search=HNSW_EF_SEARCH
+        )
+        for row in range(self._count):
+            self._hnsw.add(self._ids[row], self._vectors[row])
+        if self._count:
+            self._dirty = True
+            self.flush()
+
+    def _load(self) -> None:
+        if not self.path or not (self.path / "meta.json").exists():
+            return
+        vectors = np.load(self.path / "vectors.npy")
+        meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        self._reserve(len(vectors))
+        self._vectors[:len(vectors)] = vectors
+        self._count = len(vectors)
+        self._ids = meta["ids"]
+        self._metadata = meta["metadata"]
+        self._reindex()
+        if self.index_type == "hnsw" and (self.path / "hnsw.npz").exists():
+            self._hnsw = HNSWIndex.load(self.path / "hnsw.npz")
+            self._hnsw.ef_search = HNSW_EF_SEARCH
+        print(f"✅ Local index loaded: {self._count} vectors from {self.path}")
+
+    def flush(self) -> None:
+        """Write the index if it changed since the last flush."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+                self._dirty = False
+
+    def _save(self) -> None:
+        """Write vectors + metadata atomically (temp file, then rename)."""
+        if not self.path:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_vectors = self.path / "vectors.tmp.npy"
+        tmp_meta = self.path / "meta.tmp.json"
+        np.save(tmp_vectors, self._vectors[:self._count])
+        tmp_meta.write_text(
+            json.dumps({"ids": self._ids, "metadata": self._metadata}),
+            encoding="utf-8"
+        )
+        os.replace(tmp_vectors, self.path / "vectors.npy")
+        os.replace(tmp_meta, self.path / "meta.json")
+        if self._hnsw is not None:
+            self._hnsw.save(self.path / "hnsw.npz")
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Internal helpers
+    # ─────────────────────────────────────────────────────────────────────
+
+    def _reserve(self, capacity: int) -> None:
+        if capacity <= len(self._vectors):
+            return
+        new_capacity = max(capacity, 2 * len(self._vectors))
+        grown = np.empty((new_capacity, self.dimension), dtype=np.float32)
+        grown[:self._count] = self._vectors[:self._count]
+        self._vectors = grown
+
+    def _reindex(self) -> None:
+        self._rows = {vid: row for row, vid in enumerate(self._ids)}
+        self._doc_rows = {}
+        for row, meta in enumerate(self._metadata):
+            self._doc_rows.setdefault(meta.get("doc_id", ""), set()).add(row)
+
+    def _maybe_compact_hnsw(self) -> None:
+        """Rebuild the graph once tombstones outnumber live nodes (by the ratio)."""
+        if self._hnsw is not None and self._hnsw.tombstones > HNSW_MAX_TOMBSTONE_RATIO * max(len(self._hnsw), 1):
+            self._hnsw.compact()
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _match(self, row: int, score: float, include_values: bool) -> Match:
+        return Match(
+            id=self._ids[row],
+            score=score,
+            metadata=dict(self._metadata[row]),
+            values=self._vectors[row].tolist() if include_values else []
+        )
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Pinecone-compatible API
+    # ─────────────────────────────────────────────────────────────────────
+
+    def upsert(self, vectors: list[dict], **kwargs) -> UpsertResult:
+        """Insert or overwrite {id, values, metadata} dicts."""
+        if not vectors:
+            return UpsertResult(upserted_count=0)
+
+        values = self._normalize(np.asarray([v["values"] for v in vectors], dtype=np.float32))
+        with self._lock:
+            self._reserve(self._count + len(vectors))
+            for vector, row_values in zip(vectors, values):
+                vid = vector["id"]
+                metadata = dict(vector.get("metadata") or {})
+                row = self._rows.get(vid)
+                if row is None:
+                    row = self._count
+                    self._count += 1
+                    self._ids.append(vid)
+                    self._metadata.append(metadata)
+                    self._rows[vid] = row
+                else:
+                    old_doc = self._metadata[row].get("doc_id", "")
+                    self._doc_rows.get(old_doc, set()).discard(row)
+                    self._metadata[row] = metadata
+                self._vectors[row] = row_values
+                self._doc_rows.setdefault(metadata.get("doc_id", ""), set()).add(row)
+                if self._hnsw is not None:
+                    self._hnsw.add(vid, row_values)
+            self._maybe_compact_hnsw()    # Overwrites tombstone the old node
+            self._dirty = True
+        return UpsertResult(upserted_count=len(vectors))
+
+    def query(
+        self,
+        vector: list[float],
+        top_k: int = 10,
+        include_metadata: bool = True,
+        include_values: bool = False,
+        filter: Optional[dict] = None,
+        **kwargs
+    ) -> QueryResult:
+        """Cosine top-k: HNSW if enabled (unfiltered), else matmul + argpartition."""
+        doc_id = _filter_doc_id(filter)
+        query = self._normalize(np.asarray(vector, dtype=np.float32))
+
+        with self._lock:
+            if doc_id is None and self._hnsw is not None:
+                return QueryResult(matches=[
+                    self._match(self._rows[label], score, include_values)
+                    for label, score in self._hnsw.search(query, top_k)
+                ])
+
+            if doc_id is None:
+                rows = None
+                scores = self._vectors[:self._count] @ query
+            else:
+                rows = np.fromiter(self._doc_rows.get(doc_id, ()), dtype=np.int64)
+                scores = self._vectors[rows] @ query
+
+            k = min(top_k, len(scores))
+            if k == 0:
+                return QueryResult(matches=[])
+            if k < len(scores):
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(len(scores))
+            top = top[np.argsort(-scores[top], kind="stable")]
+
+            matches = []
+            for i in top:
+                row = int(rows[i]) if rows is not None else int(i)
+                matches.append(self._match(row, float(scores[i]), include_values))
+        return QueryResult(matches=matches)
+
+    def fetch(self, ids: list[str], **kwargs) -> FetchResult:
+        """Look up vectors by id (missing ids are omitted)."""
+        with self._lock:
+            return FetchResult(vectors={
+                vid: self._match(self._rows[vid], 1.0, include_values=True)
+                for vid in ids if vid in self._rows
+            })
+
+    def list(self, prefix: Optional[str] = None, limit: int = 100, **kwargs) -> Iterator[list[str]]:
+        """Vector IDs starting with prefix, in pages of up to limit."""
+        with self._lock:
+            ids = [vid for vid in self._ids if not prefix or vid.startswith(prefix)]
+        for i in range(0, len(ids), limit):
+            yield ids[i:i + limit]
+
+    def delete(
+        self,
+        ids: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+        **kwargs
+    ) -> dict:
+        """Delete by ids and/or doc_id filter, then compact the matrix."""
+        doc_id = _filter_doc_id(filter)
+        with self._lock:
+            remove = set()
+            if doc_id is not None:
+                remove |= self._doc_rows.get(doc_id, set())
+            for vid in ids or []:
+                if vid in self._rows:
+                    remove.add(self._rows[vid])
+            if not remove:
+                return {}
+
+            if self._hnsw is not None:
+                for row in remove:
+                    self._hnsw.mark_deleted(self._ids[row])
+                self._maybe_compact_hnsw()
+
+            keep = np.setdiff1d(np.arange(self._count), np.fromiter(remove, dtype=np.int64))
+            self._vectors[:len(keep)] = self._vectors[keep]
+            self._ids = [self._ids[i] for i in keep]
+            self._metadata = [self._metadata[i] for i in keep]
+            self._count = len(keep)
+            self._reindex()
+            self._dirty = True
+        return {}
+
+    def describe_index_stats(self, **kwargs) -> IndexStats:
+        return IndexStats(total_vector_count=self._count)
@@ -0,0 +1,116 @@
+"""
+Maximal Marginal Relevance (MMR) diversification of retrieved chunks.
+
+Why:
+- Chunks overlap by 120 tokens, so neighbouring chunks of the same passage
+  often fill several of the top-20 slots. Each near-duplicate costs a
+  rerank slot and, if it survives, LLM prompt tokens for no new content
+
+MMR greedily picks the candidate maximizing
+    λ · sim(query, c)  −  (1 − λ) · max sim(c, already picked)
+λ = 1 is pure relevance; lower λ trades relevance for diversity.
+
+Implementation:
+- One matmul gives the full candidate × candidate cosine matrix, one more
+  the query similarities; the greedy loop only updates a running max
+  vector, so each of the k steps is a couple of O(n) array ops
+- Candidates missing an embedding (lexical-only hits) get it from one
+  bulk index fetch
+"""
+
+from __future__ import annotations
+import os
+from typing import Optional, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .retriever import RetrievedChunk
+
+# Candidates kept for reranking and relevance/diversity weight. Off by default
+# (0): enabling it makes every dense query also return its match vectors
+MMR_K = int(os.getenv("MMR_K", "0"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+
+
+def mmr_select(
+    query_embedding,
+    embeddings,
+    k: int,
+    lambda_mult: float = MMR_LAMBDA
+) -> list[int]:
+    """
+    Indices of k rows of embeddings chosen by MMR, in selection order.
+
+    Args:
+        query_embedding: (dim,) query vector
+        embeddings: (n, dim) candidate vectors
+        k: How many to select
+        lambda_mult: Relevance weight in [0, 1]
+    """
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    n = len(vectors)
+    if n == 0 or k <= 0:
+        return []
+    if k >= n:
+        k = n
+
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = vectors @ query            # (n,)
+    pairwise = vectors @ vectors.T         # (n, n)
+
+    selected: list[int] = []
+    available = np.ones(n, dtype=bool)
+    redundancy = np.full(n, -np.inf, dtype=np.float32)
+    for _ in range(k):
+        if selected:
+            scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        else:
+            scores = relevance.copy()
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, pairwise[best], out=redundancy)
+    return selected
+
+
+def _fill_embeddings(chunks: list[RetrievedChunk]) -> None:
+    """Fetch embeddings for chunks retrieved without one (one bulk fetch)."""
+    from .vector_store import get_index
+
+    missing = [chunk.chunk_id for chunk in chunks if chunk.embedding is None]
+    if not missing:
+        return
+    fetched = get_index().fetch(ids=missing).vectors
+    for chunk in chunks:
+        if chunk.embedding is None and chunk.chunk_id in fetched:
+            chunk.embedding = list(fetched[chunk.chunk_id].values)
+
+
+def diversify(
+    query_embedding: list[float],
+    chunks: list[RetrievedChunk],
+    k: int = MMR_K,
+    lambda_mult: float = MMR_LAMBDA
+) -> list[RetrievedChunk]:
+    """
+    Keep the k most relevant-yet-diverse chunks (MMR order).
+
+    Chunks whose embedding can't be found are treated as orthogonal to
+    everything, i.e. kept only if slots remain.
+    """
+    if k <= 0 or len(chunks) <= k:
+        return chunks
+
+    _fill_embeddings(chunks)
+    dim = len(query_embedding)
+    embeddings = np.zeros((len(chunks), dim), dtype=np.float32)
+    for i, chunk in enumerate(chunks):
+        if chunk.embedding is not None:
+            embeddings[i] = chunk.embedding
+
+    return [chunks[i] for i in mmr_select(query_embedding, embeddings, k, lambda_mult)]
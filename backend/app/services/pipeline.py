@@ -2,9 +2,12 @@
 Unified RAG Pipeline
 ═══════════════════════════════════════════════════════════════════════════════
 
-Flow: Query → Embed → Retrieve → Rerank → LLM → Answer + Citations
+Flow: Query → Embed → [semantic cache] → Retrieve → [MMR] → Rerank
+      → Pack context (token budget) → [answer cache] → LLM → Answer + Citations
 
 This is the main entry point for the RAG system. One function, clear flow.
+rag_pipeline_async is the same flow for the async request path, and
+rag_pipeline_stream streams its sources and answer tokens as events.
 
 NOTE: All heavy imports (embedder, vector_store, reranker, llm) are done
 inside functions to enable lazy loading. This reduces startup memory,
@@ -12,13 +15,21 @@ allowing deployment on Render free tier (512MB).
 """
 
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Optional, TYPE_CHECKING
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from dataclasses import dataclass, field, replace
+from typing import AsyncIterator, Callable, Iterable, Optional, TYPE_CHECKING
 
 # Type hints only - no runtime import
 if TYPE_CHECKING:
     from .retriever import RetrievedChunk
     from .llm import AnswerResponse
+    from .context import PackedContext
 
 
 @dataclass
@@ -30,6 +41,8 @@ class RAGResult:
     tokens_used: int                    # LLM token consumption
     retrieval_count: int                # Chunks retrieved from vector DB
     rerank_count: int                   # Chunks after reranking
+    context_tokens: int = 0             # Estimated prompt tokens after packing
+    dropped_chunks: list[str] = field(default_factory=list)  # Reranked but left out of the prompt
     
     def to_dict(self) -> dict:
         return {
@@ -38,26 +51,194 @@ class RAGResult:
             "has_answer": self.has_answer,
             "tokens_used": self.tokens_used,
             "retrieval_count": self.retrieval_count,
-            "rerank_count": self.rerank_count
+            "rerank_count": self.rerank_count,
+            "context_tokens": self.context_tokens,
+            "dropped_chunks": self.dropped_chunks
         }
 
 
+def _no_documents_result() -> RAGResult:
+    """Result when retrieval finds nothing."""
+    return RAGResult(
+        answer="I cannot answer this question as no relevant documents were found in the knowledge base.",
+        sources=[],
+        has_answer=False,
+        tokens_used=0,
+        retrieval_count=0,
+        rerank_count=0
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ANSWER CACHE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Popular questions repeat; a hit skips the LLM call entirely.
+# Key = normalized question + ordered reranked (chunk_id, text hash) +
+#       model + generation params, so any change to the context misses.
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+ANSWER_CACHE_TTL_S = float(os.getenv("ANSWER_CACHE_TTL_S", "3600"))
+
+
+class AnswerCache:
+    """Bounded LRU + TTL cache of RAGResults, invalidated per document."""
+    
+    def __init__(self, max_items: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL_S):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, RAGResult, frozenset]] = OrderedDict()
+        self._doc_keys: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def key(question: str, chunks: list[RetrievedChunk]) -> str:
+        from .llm import LLM_MAX_TOKENS, LLM_MODEL, LLM_TEMPERATURE
+        
+        h = hashlib.sha256()
+        h.update(" ".join(question.lower().split()).encode("utf-8"))
+        for chunk in chunks:
+            h.update(b"\0" + chunk.chunk_id.encode("utf-8") + b"\0")
+            h.update(hashlib.sha256(chunk.text.encode("utf-8", errors="surrogatepass")).digest())
+        h.update(f"\0{LLM_MODEL}\0{LLM_MAX_TOKENS}\0{LLM_TEMPERATURE}".encode("utf-8"))
+        return h.hexdigest()
+    
+    def get(self, key: str) -> Optional[RAGResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key: str, result: RAGResult, doc_ids: set[str]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result, frozenset(doc_ids))
+            self._entries.move_to_end(key)
+            for doc_id in doc_ids:
+                self._doc_keys.setdefault(doc_id, set()).add(key)
+            while len(self._entries) > self.max_items:
+                self._drop(next(iter(self._entries)))
+    
+    def _drop(self, key: str) -> None:
+        _, _, doc_ids = self._entries.pop(key)
+        for doc_id in doc_ids:
+            keys = self._doc_keys.get(doc_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._doc_keys[doc_id]
+    
+    def invalidate_document(self, doc_id: str) -> None:
+        with self._lock:
+            for key in list(self._doc_keys.get(doc_id, ())):
+                self._drop(key)
+    
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "items": len(self._entries),
+            "max_items": self.max_items,
+            "ttl_s": self.ttl
+        }
+
+
+_answer_cache: Optional[AnswerCache] = None
+
+
+def get_answer_cache() -> AnswerCache:
+    """Get or create the answer cache."""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = AnswerCache()
+    return _answer_cache
+
+
+def get_answer_cache_stats() -> dict:
+    return get_answer_cache().stats()
+
+
+def _cached_answer(query: str, reranked_chunks: list[RetrievedChunk], retrieval_count: int) -> tuple[str, Optional[RAGResult]]:
+    """(cache key, cached result with this query's retrieval_count, or None)."""
+    key = AnswerCache.key(query, reranked_chunks)
+    cached = get_answer_cache().get(key)
+    if cached is not None:
+        cached = replace(cached, retrieval_count=retrieval_count)
+    return key, cached
+
+
+def _cache_answer(key: str, result: RAGResult, reranked_chunks: list[RetrievedChunk]) -> None:
+    get_answer_cache().put(key, result, {chunk.doc_id for chunk in reranked_chunks})
+
+
+def _build_result(
+    llm_response: AnswerResponse,
+    context: PackedContext,
+    retrieval_count: int
+) -> RAGResult:
+    """Build clean response with sources for frontend."""
+    return RAGResult(
+        answer=llm_response.answer,
+        sources=_build_sources(context.chunks),
+        has_answer=llm_response.has_answer,
+        tokens_used=llm_response.tokens_used,
+        retrieval_count=retrieval_count,
+        rerank_count=context.rerank_count,
+        context_tokens=context.tokens,
+        dropped_chunks=context.dropped
+    )
+
+
+def _build_sources(reranked_chunks: list[RetrievedChunk]) -> list[dict]:
+    """Numbered source dicts, in citation order."""
+    sources = []
+    for i, chunk in enumerate(reranked_chunks, 1):
+        sources.append({
+            "index": i,
+            "chunk_id": chunk.chunk_id,
+            "chunk_ids": chunk.chunk_ids or [chunk.chunk_id],
+            "doc_id": chunk.doc_id,
+            "text": chunk.text,
+            "score": round(chunk.score, 4),
+            "title": chunk.metadata.get("title", "Untitled"),
+            "char_start": chunk.char_start,
+            "char_end": chunk.char_end
+        })
+    return sources
+
+
 def rag_pipeline(
     query: str,
     retrieve_k: int = 20,
     rerank_k: int = 5,
-    doc_id: Optional[str] = None
+    doc_id: Optional[str] = None,
+    query_embedding: Optional[list[float]] = None,
+    mmr_k: Optional[int] = None,
+    mmr_lambda: Optional[float] = None
 ) -> RAGResult:
     """
     Execute the complete RAG pipeline.
     
-    Query → Embed → Retrieve → Rerank → LLM → Answer + Citations
+    Query → Embed → Retrieve → [MMR] → Rerank → Pack → LLM → Answer + Citations
     
     Args:
         query: User's natural language question
         retrieve_k: Number of chunks to fetch from vector DB (cast wide net)
         rerank_k: Number of chunks to keep after reranking (for LLM context)
         doc_id: Optional filter to search within a specific document
+        query_embedding: Precomputed query vector (e.g. from embed_query_async)
+        mmr_k: Chunks kept by MMR diversification before reranking
+               (default MMR_K; 0 disables)
+        mmr_lambda: MMR relevance weight, 1.0 = no diversity (default MMR_LAMBDA)
         
     Returns:
         RAGResult with answer, sources, and metadata
@@ -69,56 +250,52 @@ def rag_pipeline(
             print(f"[{src['index']}] {src['text'][:100]}...")
     """
     # Lazy imports to reduce startup memory
-    from .vector_store import query_similar
-    from .retriever import RetrievedChunk
+    from .retriever import chunks_from_matches, hybrid_matches
     from .reranker import rerank
     from .llm import generate_answer
+    from .mmr import MMR_K, MMR_LAMBDA, diversify
+    from .context import pack_context
+    from .semantic_cache import get_semantic_cache
+    
+    mmr_k = MMR_K if mmr_k is None else mmr_k
+    mmr_lambda = MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+    semantic_cache = get_semantic_cache()
+    corpus_version = semantic_cache.version
+    cache_params = (retrieve_k, rerank_k, mmr_k, mmr_lambda)
     
     # ─────────────────────────────────────────────────────────────────────────
     # STEP 1: RETRIEVE
     # Embed query and fetch top-k similar chunks from vector DB
     # ─────────────────────────────────────────────────────────────────────────
     
-    # Build optional filter
-    filter_dict = {"doc_id": {"$eq": doc_id}} if doc_id else None
-    
-    # Query vector store (embeds query internally)
-    matches = query_similar(query=query, top_k=retrieve_k, filter_doc_id=doc_id)
+    # MMR and the semantic cache need the query vector itself
+    if (mmr_k or semantic_cache.enabled) and query_embedding is None:
+        from .embedder import embed_query
+        query_embedding = embed_query(query)
     
-    # Convert to RetrievedChunk objects
-    retrieved_chunks = []
-    for match in matches:
-        meta = match["metadata"]
-        # Separate core fields from user metadata
-        core_fields = {"text", "doc_id", "chunk_index", "total_chunks",
-                       "char_start", "char_end", "token_count", "created_at"}
-        user_meta = {k: v for k, v in meta.items() if k not in core_fields}
-        
-        chunk = RetrievedChunk(
-            chunk_id=match["id"],
-            doc_id=meta.get("doc_id", ""),
-            text=meta.get("text", ""),
-            score=match["score"],
-            chunk_index=meta.get("chunk_index", 0),
-            total_chunks=meta.get("total_chunks", 1),
-            char_start=meta.get("char_start", 0),
-            char_end=meta.get("char_end", 0),
-            metadata=user_meta
-        )
-        retrieved_chunks.append(chunk)
+    # Paraphrase of a recent question: reuse its answer
+    cached = semantic_cache.get(query_embedding, doc_id, cache_params) if query_embedding is not None else None
+    if cached is not None:
+        return cached
     
-    retrieval_count = len(retrieved_chunks)
+    # Dense + BM25 search, rank-fused (embeds query unless precomputed)
+    matches = hybrid_matches(
+        query=query,
+        top_k=retrieve_k,
+        filter_doc_id=doc_id,
+        query_embedding=query_embedding,
+        include_values=bool(mmr_k)
+    )
+    retrieved_chunks = chunks_from_matches(matches)
     
     # Handle empty retrieval
     if not retrieved_chunks:
-        return RAGResult(
-            answer="I cannot answer this question as no relevant documents were found in the knowledge base.",
-            sources=[],
-            has_answer=False,
-            tokens_used=0,
-            retrieval_count=0,
-            rerank_count=0
-        )
+        return _no_documents_result()
+    
+    # Drop near-duplicate (overlapping) candidates before they cost rerank slots
+    candidates = retrieved_chunks
+    if mmr_k:
+        candidates = diversify(query_embedding, retrieved_chunks, mmr_k, mmr_lambda)
     
     # ─────────────────────────────────────────────────────────────────────────
     # STEP 2: RERANK
@@ -127,60 +304,377 @@ def rag_pipeline(
     
     reranked_chunks = rerank(
         query=query,
-        chunks=retrieved_chunks,
+        chunks=candidates,
         top_k=rerank_k
     )
     
-    rerank_count = len(reranked_chunks)
+    # Fit the best chunks into the prompt token budget
+    context = pack_context(query, reranked_chunks)
     
     # ─────────────────────────────────────────────────────────────────────────
     # STEP 3: GENERATE
-    # Send reranked chunks + query to LLM for cited answer
+    # Send packed chunks + query to LLM for cited answer (unless cached)
     # ─────────────────────────────────────────────────────────────────────────
     
-    llm_response: AnswerResponse = generate_answer(
-        question=query,
-        chunks=reranked_chunks
+    cache_key, result = _cached_answer(query, context.chunks, len(retrieved_chunks))
+    if result is None:
+        llm_response: AnswerResponse = generate_answer(
+            question=query,
+            chunks=context.chunks
+        )
+        
+        # ─────────────────────────────────────────────────────────────────────
+        # STEP 4: FORMAT RESPONSE
+        # ─────────────────────────────────────────────────────────────────────
+        
+        result = _build_result(llm_response, context, len(retrieved_chunks))
+        _cache_answer(cache_key, result, context.chunks)
+    
+    semantic_cache.put(query_embedding, doc_id, cache_params, corpus_version, result)
+    return result
+
+
+async def _retrieve_and_rerank_async(
+    query: str,
+    retrieve_k: int,
+    rerank_k: int,
+    doc_id: Optional[str],
+    query_embedding: list[float],
+    mmr_k: Optional[int],
+    mmr_lambda: Optional[float],
+    rerank_slots: Optional[asyncio.Semaphore] = None
+) -> tuple[int, list[RetrievedChunk]]:
+    """Async steps 1-2 (retrieve, diversify, rerank). Returns (retrieval_count, reranked)."""
+    from .vector_store import query_similar
+    from .retriever import chunks_from_matches, fuse_matches, lexical_search
+    from .reranker import rerank
+    from .mmr import MMR_K, MMR_LAMBDA, diversify
+    
+    mmr_k = MMR_K if mmr_k is None else mmr_k
+    mmr_lambda = MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+    
+    # STEP 1: RETRIEVE
+    # Dense and lexical searches run concurrently, then fuse
+    dense, lexical = await asyncio.gather(
+        asyncio.to_thread(
+            query_similar,
+            query=query,
+            top_k=retrieve_k,
+            filter_doc_id=doc_id,
+            query_embedding=query_embedding,
+            include_values=bool(mmr_k)
+        ),
+        asyncio.to_thread(lexical_search, query, retrieve_k, doc_id)
+    )
+    retrieved_chunks = await asyncio.to_thread(
+        lambda: chunks_from_matches(fuse_matches(dense, lexical, retrieve_k))
     )
     
-    # ─────────────────────────────────────────────────────────────────────────
-    # STEP 4: FORMAT RESPONSE
-    # Build clean response with sources for frontend
-    # ─────────────────────────────────────────────────────────────────────────
+    if not retrieved_chunks:
+        return 0, []
     
-    sources = []
-    for i, chunk in enumerate(reranked_chunks, 1):
-        sources.append({
-            "index": i,
-            "chunk_id": chunk.chunk_id,
-            "doc_id": chunk.doc_id,
-            "text": chunk.text,
-            "score": round(chunk.score, 4),
-            "title": chunk.metadata.get("title", "Untitled"),
-            "char_start": chunk.char_start,
-            "char_end": chunk.char_end
+    candidates = retrieved_chunks
+    if mmr_k:
+        candidates = await asyncio.to_thread(
+            diversify, query_embedding, retrieved_chunks, mmr_k, mmr_lambda
+        )
+    
+    # STEP 2: RERANK (rerank_slots caps concurrent calls for fan-out callers)
+    async with rerank_slots or nullcontext():
+        reranked_chunks = await asyncio.to_thread(
+            rerank,
+            query=query,
+            chunks=candidates,
+            top_k=rerank_k
+        )
+    return len(retrieved_chunks), reranked_chunks
+
+
+async def rag_pipeline_async(
+    query: str,
+    retrieve_k: int = 20,
+    rerank_k: int = 5,
+    doc_id: Optional[str] = None,
+    query_embedding: Optional[list[float]] = None,
+    mmr_k: Optional[int] = None,
+    mmr_lambda: Optional[float] = None,
+    rerank_slots: Optional[asyncio.Semaphore] = None
+) -> RAGResult:
+    """
+    Non-blocking rag_pipeline for the FastAPI request path.
+    
+    Same steps and arguments as rag_pipeline, but nothing blocks the event
+    loop: the query embedding is micro-batched, the Pinecone and Cohere SDK
+    calls run in worker threads, and Groq is awaited on its async client.
+    Concurrent queries overlap their network waits.
+    
+    Fan-out callers (see batch.py) can cap concurrent rerank calls with
+    rerank_slots. LLM requests are always paced by the shared Groq rate
+    limiter (llm.get_rate_limiter); cache hits skip it.
+    """
+    from .embedder import embed_query_async
+    from .llm import generate_answer_async
+    from .context import pack_context
+    from .mmr import MMR_K, MMR_LAMBDA
+    from .semantic_cache import get_semantic_cache
+    
+    mmr_k = MMR_K if mmr_k is None else mmr_k
+    mmr_lambda = MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+    semantic_cache = get_semantic_cache()
+    corpus_version = semantic_cache.version
+    cache_params = (retrieve_k, rerank_k, mmr_k, mmr_lambda)
+    if query_embedding is None:
+        query_embedding = await embed_query_async(query)
+    
+    cached = semantic_cache.get(query_embedding, doc_id, cache_params)
+    if cached is not None:
+        return cached
+    
+    retrieval_count, reranked_chunks = await _retrieve_and_rerank_async(
+        query, retrieve_k, rerank_k, doc_id, query_embedding, mmr_k, mmr_lambda, rerank_slots
+    )
+    if not retrieval_count:
+        return _no_documents_result()
+    
+    context = await asyncio.to_thread(pack_context, query, reranked_chunks)
+    
+    # STEP 3: GENERATE (unless cached)
+    cache_key, result = _cached_answer(query, context.chunks, retrieval_count)
+    if result is None:
+        llm_response = await generate_answer_async(
+            question=query,
+            chunks=context.chunks
+        )
+        
+        # STEP 4: FORMAT RESPONSE
+        result = _build_result(llm_response, context, retrieval_count)
+        _cache_answer(cache_key, result, context.chunks)
+    
+    semantic_cache.put(query_embedding, doc_id, cache_params, corpus_version, result)
+    return result
+
+
+def _replay_events(result: RAGResult) -> list[tuple[str, dict]]:
+    """Stream events for an already-complete (cached) result."""
+    return [
+        ("sources", {
+            "sources": result.sources,
+            "retrieval_count": result.retrieval_count,
+            "rerank_count": result.rerank_count,
+            "context_tokens": result.context_tokens,
+            "dropped_chunks": result.dropped_chunks
+        }),
+        ("token", {"text": result.answer}),
+        ("done", {
+            "answer": result.answer,
+            "has_answer": result.has_answer,
+            "tokens_used": result.tokens_used
         })
+    ]
+
+
+async def rag_pipeline_stream(
+    query: str,
+    retrieve_k: int = 20,
+    rerank_k: int = 5,
+    doc_id: Optional[str] = None,
+    query_embedding: Optional[list[float]] = None,
+    mmr_k: Optional[int] = None,
+    mmr_lambda: Optional[float] = None
+) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Streaming rag_pipeline_async: yields (event, data) pairs as they happen.
     
-    return RAGResult(
-        answer=llm_response.answer,
-        sources=sources,
-        has_answer=llm_response.has_answer,
-        tokens_used=llm_response.tokens_used,
-        retrieval_count=retrieval_count,
-        rerank_count=rerank_count
+    Events:
+        "sources": {sources, retrieval_count, rerank_count, context_tokens,
+                    dropped_chunks} — right after rerank and packing
+        "token":   {text} — one per LLM delta
+        "done":    {answer, has_answer, tokens_used}
+    
+    Time to first event is retrieval + rerank latency; the answer follows
+    token by token instead of after the full completion.
+    """
+    from .embedder import embed_query_async
+    from .llm import stream_answer_async
+    from .context import pack_context
+    from .mmr import MMR_K, MMR_LAMBDA
+    from .semantic_cache import get_semantic_cache
+    
+    mmr_k = MMR_K if mmr_k is None else mmr_k
+    mmr_lambda = MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+    semantic_cache = get_semantic_cache()
+    corpus_version = semantic_cache.version
+    cache_params = (retrieve_k, rerank_k, mmr_k, mmr_lambda)
+    if query_embedding is None:
+        query_embedding = await embed_query_async(query)
+    
+    # Cached answer (semantic or exact): one token event carrying the whole text
+    cached = semantic_cache.get(query_embedding, doc_id, cache_params)
+    if cached is not None:
+        for event in _replay_events(cached):
+            yield event
+        return
+    
+    retrieval_count, reranked_chunks = await _retrieve_and_rerank_async(
+        query, retrieve_k, rerank_k, doc_id, query_embedding, mmr_k, mmr_lambda
     )
+    if not retrieval_count:
+        result = _no_documents_result()
+        yield "sources", {
+            "sources": [],
+            "retrieval_count": 0,
+            "rerank_count": 0,
+            "context_tokens": 0,
+            "dropped_chunks": []
+        }
+        yield "done", {"answer": result.answer, "has_answer": False, "tokens_used": 0}
+        return
+    
+    context = await asyncio.to_thread(pack_context, query, reranked_chunks)
+    cache_key, cached = _cached_answer(query, context.chunks, retrieval_count)
+    if cached is not None:
+        semantic_cache.put(query_embedding, doc_id, cache_params, corpus_version, cached)
+        for event in _replay_events(cached):
+            yield event
+        return
+    
+    yield "sources", {
+        "sources": _build_sources(context.chunks),
+        "retrieval_count": retrieval_count,
+        "rerank_count": context.rerank_count,
+        "context_tokens": context.tokens,
+        "dropped_chunks": context.dropped
+    }
+    
+    async for delta in stream_answer_async(question=query, chunks=context.chunks):
+        if isinstance(delta, str):
+            yield "token", {"text": delta}
+        else:
+            # Final AnswerResponse
+            result = _build_result(delta, context, retrieval_count)
+            _cache_answer(cache_key, result, context.chunks)
+            semantic_cache.put(query_embedding, doc_id, cache_params, corpus_version, result)
+            yield "done", {
+                "answer": delta.answer,
+                "has_answer": delta.has_answer,
+                "tokens_used": delta.tokens_used
+            }
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # INGEST PIPELINE
 # ═══════════════════════════════════════════════════════════════════════════════
 
+def _upsert_staged(
+    chunks: Iterable,
+    on_progress: Optional[Callable[[int], None]] = None
+) -> tuple[Optional[str], list[str], Optional[dict]]:
+    """
+    Embed and upsert chunks through the staged ingest pipeline.
+    
+    Embedding of batch N+1 overlaps the upsert of batch N; bounded queues
+    keep memory flat (see ingest_stages.py).
+    
+    If any stage fails (or the chunk source raises, e.g. a FileExtractionError
+    on a later page of a streamed file), every chunk already handed to the
+    stages is deleted before the error is re-raised, so a failed ingest
+    leaves no partial document behind. Chunk IDs are deterministic, so a
+    failed re-ingest has already overwritten part of the previous version;
+    that version is then deleted entirely (vectors, text, BM25, registry)
+    rather than left listed in /documents with chunks missing.
+    
+    Returns:
+        (doc_id, chunk_ids, first_chunk_info) — info has created_at and title
+    """
+    from .doc_registry import get_registry
+    from .ingest_stages import run_ingest_stages
+    from .vector_store import delete_chunks
+    
+    started: list[str] = []
+    doc_ids: set[str] = set()
+    
+    def tracked(chunks: Iterable):
+        for chunk in chunks:
+            started.append(chunk.chunk_id)
+            doc_ids.add(chunk.doc_id)
+            yield chunk
+    
+    try:
+        stats = run_ingest_stages(tracked(chunks), on_progress=on_progress)
+    except Exception:
+        if started:
+            try:
+                delete_chunks(started)
+                for doc_id in doc_ids:
+                    if get_registry().get(doc_id) is not None:
+                        print(f"⚠️ Re-ingest of {doc_id} failed; removing its previous version")
+                        delete_document(doc_id)
+                    else:
+                        invalidate_document(doc_id)
+            except Exception as cleanup_error:
+                print(f"⚠️ Could not remove {len(started)} partially ingested chunks: {cleanup_error}")
+        raise
+    if not stats.chunk_ids:
+        return None, [], None
+    return stats.doc_id, stats.chunk_ids, {"created_at": stats.created_at, "title": stats.title}
+
+
+def invalidate_document(doc_id: str) -> None:
+    """
+    Drop cached query-time results that depend on a document's chunks.
+    
+    Called whenever a document is (re-)ingested or deleted; every cache
+    keyed on chunk content registers its invalidation here.
+    """
+    from .reranker import get_cache as get_rerank_cache
+    from .semantic_cache import get_semantic_cache
+    
+    get_rerank_cache().invalidate_document(doc_id)
+    get_answer_cache().invalidate_document(doc_id)
+    get_semantic_cache().bump_version()
+
+
+def delete_document(doc_id: str) -> dict:
+    """Delete a document's chunks, registry entry and cached results."""
+    from .vector_store import delete_document as delete_vectors
+    
+    result = delete_vectors(doc_id)
+    invalidate_document(doc_id)
+    return result
+
+
+def _register_document(doc_id: str, chunk_ids: list[str], info: dict, byte_size: int) -> None:
+    """Record the document in the registry; drop chunks left over from a previous, longer version."""
+    from .bm25_index import get_bm25_index
+    from .doc_registry import get_registry
+    from .vector_store import delete_chunks, flush_index
+    
+    registry = get_registry()
+    previous = registry.get(doc_id)
+    if previous:
+        stale = set(previous["chunk_ids"]) - set(chunk_ids)
+        if stale:
+            delete_chunks(sorted(stale))
+    
+    registry.upsert(
+        doc_id=doc_id,
+        title=info.get("title"),
+        chunk_ids=chunk_ids,
+        created_at=info["created_at"],
+        byte_size=byte_size
+    )
+    flush_index()
+    get_bm25_index().flush()
+    invalidate_document(doc_id)
+
+
 def ingest_text(
     text: str,
     doc_id: Optional[str] = None,
     metadata: Optional[dict] = None,
     chunk_size: int = 1000,
-    chunk_overlap: int = 120
+    chunk_overlap: int = 120,
+    on_progress: Optional[Callable[[int], None]] = None
 ) -> dict:
     """
     Ingest text into the RAG system.
@@ -193,12 +687,12 @@ def ingest_text(
         metadata: Optional metadata (title, source, etc.)
         chunk_size: Tokens per chunk
         chunk_overlap: Overlap tokens between chunks
+        on_progress: Called with the running count of stored chunks
         
     Returns:
         {"doc_id": str, "chunks_created": int, "status": str}
     """
     from .chunker import chunk_text
-    from .vector_store import upsert_chunks
     
     # Chunk the text
     chunks = chunk_text(
@@ -212,11 +706,68 @@ def ingest_text(
     if not chunks:
         return {"doc_id": None, "chunks_created": 0, "status": "empty_text"}
     
-    # Embed and store
-    result = upsert_chunks(chunks)
+    # Embed and store, stages overlapping
+    result_doc_id, chunk_ids, info = _upsert_staged(chunks, on_progress)
+    _register_document(result_doc_id, chunk_ids, info, len(text.encode("utf-8")))
+    
+    return {
+        "doc_id": result_doc_id,
+        "chunks_created": len(chunk_ids),
+        "status": "success"
+    }
+
+
+def ingest_stream(
+    pieces: Iterable[str],
+    doc_id: Optional[str] = None,
+    metadata: Optional[dict] = None,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 120,
+    on_progress: Optional[Callable[[int], None]] = None
+) -> dict:
+    """
+    Streaming ingest: peak memory stays flat regardless of document size.
+    
+    Text pieces → lazy Chunks → Embed + Store (staged)
+    
+    Args:
+        pieces: Iterable of text pieces, e.g. file_extractor.iter_text(...)
+        doc_id, metadata, chunk_size, chunk_overlap, on_progress: As in ingest_text
+        
+    Returns:
+        {"doc_id": str, "chunks_created": int, "status": str}
+        
+    Note: streamed chunks are stored with total_chunks=0 (the count isn't
+    known until the stream ends); chunks_created and the document registry
+    hold the real count.
+    """
+    from .chunker import iter_chunks
+    
+    byte_size = 0
+    
+    def counted(pieces: Iterable[str]):
+        nonlocal byte_size
+        for piece in pieces:
+            byte_size += len(piece.encode("utf-8"))
+            yield piece
+    
+    chunks = iter_chunks(
+        counted(pieces),
+        doc_id=doc_id,
+        metadata=metadata or {},
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    )
+    
+    result_doc_id, chunk_ids, info = _upsert_staged(chunks, on_progress)
+    
+    if not chunk_ids:
+        return {"doc_id": None, "chunks_created": 0, "status": "empty_text"}
+    
+    _register_document(result_doc_id, chunk_ids, info, byte_size)
     
     return {
-        "doc_id": result["doc_id"],
-        "chunks_created": result["upserted_count"],
+        "doc_id": result_doc_id,
+        "chunks_created": len(chunk_ids),
         "status": "success"
     }
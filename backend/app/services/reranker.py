@@ -25,18 +25,44 @@ Cohere Rerank:
 - Model: rerank-english-v3.0 (or rerank-multilingual-v3.0)
 - Latency: ~200ms for 20 documents
 
+Score cache:
+- Key = (normalized query hash, chunk_id, chunk text hash, model) → score
+- Cohere relevance scores are per (query, document) pair, so cached and
+  fresh scores can be mixed: only uncached documents are sent, and a fully
+  cached candidate set skips the API call entirely
+- Bounded LRU in memory; entries for a document are dropped when it is
+  re-ingested or deleted (pipeline.invalidate_document)
+
+Local reranker (local_reranker.py):
+- Fallback: if the Cohere call fails or exceeds RERANK_TIMEOUT_S, the
+  candidates are ranked locally instead (RERANK_FALLBACK=none to raise)
+- Cascade: with RERANK_CASCADE_K set, candidates are pruned locally to
+  that many before the Cohere call
+
 NOTE: Lazy imports used to reduce startup memory for Render free tier.
 """
 
 from __future__ import annotations
+import hashlib
 import os
+import threading
+from collections import OrderedDict
+from dataclasses import replace
 from typing import Optional, TYPE_CHECKING
 import cohere
 
+from . import local_reranker
+
 if TYPE_CHECKING:
     from .retriever import RetrievedChunk
 
 
+DEFAULT_MODEL = "rerank-english-v3.0"
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "20000"))
+RERANK_TIMEOUT_S = float(os.getenv("RERANK_TIMEOUT_S", "3"))
+RERANK_FALLBACK = os.getenv("RERANK_FALLBACK", "local").lower()   # "local" or "none"
+RERANK_CASCADE_K = int(os.getenv("RERANK_CASCADE_K", "0"))        # 0 = no cascade
+
 # Cohere client singleton
 _client: Optional[cohere.Client] = None
 
@@ -52,15 +78,109 @@ def get_client() -> cohere.Client:
     return _client
 
 
+# ═══════════════════════════════════════════════════════════════════════════
+# SCORE CACHE
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class RerankCache:
+    """Bounded LRU of (query, chunk, content, model) → relevance score."""
+
+    def __init__(self, max_items: int = RERANK_CACHE_SIZE):
+        self.max_items = max_items
+        self._scores: OrderedDict[tuple, tuple[float, str]] = OrderedDict()   # key → (score, doc_id)
+        self._doc_keys: dict[str, set[tuple]] = {}   # doc_id → keys, for invalidation
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+
+    @staticmethod
+    def key(query: str, chunk, model: str) -> tuple:
+        query_hash = hashlib.sha256(_normalize_query(query).encode("utf-8")).hexdigest()[:32]
+        text_hash = hashlib.sha256(chunk.text.encode("utf-8", errors="surrogatepass")).hexdigest()[:32]
+        return (query_hash, chunk.chunk_id, text_hash, model)
+
+    def get_many(self, keys: list[tuple]) -> dict[tuple, float]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._scores.get(key)
+                if entry is not None:
+                    self._scores.move_to_end(key)
+                    found[key] = entry[0]
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: dict[tuple, float], doc_ids: dict[tuple, str]) -> None:
+        with self._lock:
+            for key, score in items.items():
+                self._scores[key] = (score, doc_ids[key])
+                self._scores.move_to_end(key)
+                self._doc_keys.setdefault(doc_ids[key], set()).add(key)
+            while len(self._scores) > self.max_items:
+                key, (_, doc_id) = self._scores.popitem(last=False)
+                keys = self._doc_keys.get(doc_id)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._doc_keys[doc_id]
+
+    def invalidate_document(self, doc_id: str) -> None:
+        with self._lock:
+            for key in self._doc_keys.pop(doc_id, ()):
+                self._scores.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "items": len(self._scores),
+            "max_items": self.max_items,
+            "local_fallbacks": self.fallbacks
+        }
+
+
+_cache: Optional[RerankCache] = None
+
+
+def get_cache() -> RerankCache:
+    """Get or create the rerank score cache."""
+    global _cache
+    if _cache is None:
+        _cache = RerankCache()
+    return _cache
+
+
+def get_cache_stats() -> dict:
+    """Hit/miss counters for the rerank score cache."""
+    return get_cache().stats()
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# RERANK
+# ═══════════════════════════════════════════════════════════════════════════
+
 def rerank(
     query: str,
     chunks: list,
     top_k: int = 5,
-    model: str = "rerank-english-v3.0"
+    model: str = DEFAULT_MODEL
 ) -> list:
     """
     Rerank retrieved chunks using Cohere Rerank API.
     
+    Scores already in the cache are reused; only the remaining chunks are
+    sent to Cohere (no call at all when every chunk is cached). With a
+    cascade configured, chunks are first pruned by the local reranker; if
+    Cohere fails or times out, the local reranker ranks them instead.
+    
     Args:
         query: The user's question
         chunks: List of chunks from vector retrieval
@@ -75,8 +195,6 @@ def rerank(
         chunks = retrieve(query, top_k=20)
         reranked = rerank(query, chunks, top_k=5)
     """
-    from .retriever import RetrievedChunk  # Lazy import
-    
     if not chunks:
         return []
     
@@ -84,40 +202,47 @@ def rerank(
         # No need to rerank if we have fewer chunks than requested
         return chunks
     
-    client = get_client()
-    
-    # Extract texts for reranking
-    documents = [chunk.text for chunk in chunks]
+    # Cascade: cheap local pruning before the paid call
+    if RERANK_CASCADE_K:
+        chunks = local_reranker.prune(query, chunks, max(RERANK_CASCADE_K, top_k))
     
-    # Call Cohere Rerank API
-    response = client.rerank(
-        query=query,
-        documents=documents,
-        top_n=top_k,
-        model=model,
-        return_documents=False  # We already have the texts
-    )
+    cache = get_cache()
+    keys = [RerankCache.key(query, chunk, model) for chunk in chunks]
+    scores = cache.get_many(keys)
     
-    # Rebuild chunks with reranker scores
-    reranked_chunks = []
-    for result in response.results:
-        original_chunk = chunks[result.index]
+    uncached = [i for i, key in enumerate(keys) if key not in scores]
+    if uncached:
+        # Call Cohere Rerank API for the uncached documents only; all of
+        # their scores are needed for the cache, so top_n covers them all
+        try:
+            response = get_client().rerank(
+                query=query,
+                documents=[chunks[i].text for i in uncached],
+                top_n=len(uncached),
+                model=model,
+                return_documents=False,  # We already have the texts
+                request_options={"timeout_in_seconds": RERANK_TIMEOUT_S, "max_retries": 0}
+            )
+        except Exception as e:
+            if RERANK_FALLBACK != "local":
+                raise
+            # Cohere scores aren't comparable to local ones: rank everything locally
+            print(f"⚠️ Cohere rerank failed ({type(e).__name__}: {e}); using local reranker")
+            cache.fallbacks += 1
+            return local_reranker.local_rerank(query, chunks, top_k)
         
-        # Create new chunk with reranker score
-        reranked_chunk = RetrievedChunk(
-            chunk_id=original_chunk.chunk_id,
-            doc_id=original_chunk.doc_id,
-            text=original_chunk.text,
-            score=result.relevance_score,  # Reranker score (0-1)
-            chunk_index=original_chunk.chunk_index,
-            total_chunks=original_chunk.total_chunks,
-            char_start=original_chunk.char_start,
-            char_end=original_chunk.char_end,
-            metadata=original_chunk.metadata
-        )
-        reranked_chunks.append(reranked_chunk)
+        fresh = {keys[uncached[r.index]]: r.relevance_score for r in response.results}
+        cache.put_many(fresh, {keys[i]: chunks[i].doc_id for i in uncached})
+        scores.update(fresh)
+    
+    ranked = sorted(
+        (i for i, key in enumerate(keys) if key in scores),
+        key=lambda i: scores[keys[i]],
+        reverse=True
+    )[:top_k]
     
-    return reranked_chunks
+    # Same chunks (token_count, embedding... carried over) with reranker scores (0-1)
+    return [replace(chunks[i], score=scores[keys[i]]) for i in ranked]
 
 
 def retrieve_and_rerank(
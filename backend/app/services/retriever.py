@@ -11,12 +11,24 @@ k Value Guidance:
 - k=5-10: Direct use without reranker, lower latency
 - k=50+: Complex queries needing broad context, higher cost
 
+Hybrid Search (HYBRID_SEARCH, on by default):
+- Dense (vector) and lexical (BM25, bm25_index.py) top-k lists are merged
+  with reciprocal-rank fusion: score = Σ 1 / (RRF_K + rank)
+- RRF needs no score calibration between cosine and BM25, and a chunk
+  ranked well by both lists rises to the top
+- Lexical-only hits get their metadata from the text store (or one index
+  fetch) so they can be reranked like any other candidate
+
 NOTE: Lazy imports used to reduce startup memory for Render free tier.
 """
 
+import os
 from dataclasses import dataclass
 from typing import Optional
 
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() in ("1", "true", "yes")
+RRF_K = 60  # Standard RRF damping constant
+
 
 @dataclass
 class RetrievedChunk:
@@ -24,12 +36,15 @@ class RetrievedChunk:
     chunk_id: str
     doc_id: str
     text: str
-    score: float              # Cosine similarity (0-1, higher = better)
+    score: float              # Cosine similarity, or RRF score when hybrid
     chunk_index: int          # Position in source document
     total_chunks: int         # Total chunks in source document
     char_start: int           # Character offset for highlighting
     char_end: int
     metadata: dict            # Title, source, etc.
+    embedding: Optional[list[float]] = None  # Set when retrieved for MMR
+    token_count: Optional[int] = None        # From metadata (None on legacy vectors)
+    chunk_ids: Optional[list[str]] = None    # Set on merged spans: every chunk covered
 
     def to_dict(self) -> dict:
         return {
@@ -68,54 +83,233 @@ def retrieve(
         for chunk in chunks[:5]:
             print(f"[{chunk.score:.3f}] {chunk.text[:100]}...")
     """
-    from .vector_store import query_similar  # Lazy import
-    
     if not query or not query.strip():
         return []
     
-    # Query vector store
-    matches = query_similar(
+    # Dense (+ lexical) search
+    matches = hybrid_matches(
         query=query,
         top_k=top_k,
         filter_doc_id=doc_id
     )
     
-    # Convert to RetrievedChunk objects
+    return chunks_from_matches(matches, min_score=min_score)
+
+
+def lexical_search(
+    query: str,
+    top_k: int = 20,
+    filter_doc_id: Optional[str] = None
+) -> list[tuple[str, float]]:
+    """BM25 top-k as (chunk_id, score); empty when hybrid search is off."""
+    if not HYBRID_SEARCH:
+        return []
+    from .bm25_index import get_bm25_index
+    return get_bm25_index().search(query, top_k=top_k, doc_id=filter_doc_id)
+
+
+def rebuild_lexical_index() -> int:
+    """
+    Startup hook: seed an empty BM25 index from the chunk text of every vector.
+    
+    bm25.npz lives under DATA_DIR, which is ephemeral on Render's free tier;
+    without this a restart silently turns hybrid search dense-only for every
+    document ingested before it. Text comes from the text store or vector
+    metadata (_lexical_metadata), in pages from index.list().
+    
+    Returns:
+        Number of chunks indexed (0 if nothing needed rebuilding)
+    """
+    if not HYBRID_SEARCH:
+        return 0
+    from .bm25_index import get_bm25_index
+    from .vector_store import get_index
+    
+    bm25 = get_bm25_index()
+    index = get_index()
+    if len(bm25) > 0:
+        return 0
+    total = index.describe_index_stats().total_vector_count
+    if total == 0:
+        return 0
+    
+    print(f"⚠️ BM25 index is empty but the vector index holds {total} vectors; rebuilding")
+    indexed = 0
+    for page in index.list():
+        for i in range(0, len(page), 100):   # Keep fetch URLs short
+            records = _lexical_metadata(page[i:i + 100])
+            rows = [
+                (chunk_id, meta.get("doc_id", ""), meta["text"])
+                for chunk_id, meta in records.items() if meta.get("text")
+            ]
+            bm25.add_many(rows)
+            indexed += len(rows)
+    bm25.flush()
+    if indexed < total:
+        print(f"⚠️ {total - indexed} chunks have no stored text; lexical search will miss them")
+    print(f"✅ BM25 index rebuilt: {indexed} chunks")
+    return indexed
+
+
+def _lexical_metadata(chunk_ids: list[str]) -> dict[str, dict]:
+    """Metadata for lexical-only hits: text store first, then one index fetch."""
+    from .text_store import get_text_store, text_store_enabled
+    from .vector_store import get_index
+    
+    found = get_text_store().get_records(chunk_ids) if text_store_enabled() else {}
+    missing = [cid for cid in chunk_ids if cid not in found]
+    if missing:
+        fetched = get_index().fetch(ids=missing).vectors
+        for cid, vector in fetched.items():
+            found[cid] = dict(vector.metadata or {})
+    return found
+
+
+def fuse_matches(
+    dense: list[dict],
+    lexical: list[tuple[str, float]],
+    top_k: int = 20
+) -> list[dict]:
+    """
+    Reciprocal-rank fusion of dense matches and lexical (chunk_id, score) hits.
+    
+    Returns:
+        Up to top_k {id, score, metadata} dicts, score = fused RRF score
+    """
+    if not lexical:
+        return dense[:top_k]
+    
+    fused: dict[str, float] = {}
+    for rank, match in enumerate(dense):
+        fused[match["id"]] = fused.get(match["id"], 0.0) + 1.0 / (RRF_K + rank + 1)
+    for rank, (chunk_id, _) in enumerate(lexical):
+        fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+    
+    top = sorted(fused, key=fused.get, reverse=True)[:top_k]
+    by_id = {match["id"]: match for match in dense}
+    metadata = {cid: match["metadata"] for cid, match in by_id.items()}
+    lexical_only = [cid for cid in top if cid not in metadata]
+    if lexical_only:
+        metadata.update(_lexical_metadata(lexical_only))
+    
+    fused_matches = []
+    for cid in top:
+        if cid not in metadata:
+            continue    # Hit deleted from the index
+        match = {"id": cid, "score": fused[cid], "metadata": metadata[cid]}
+        if "values" in by_id.get(cid, {}):
+            match["values"] = by_id[cid]["values"]
+        fused_matches.append(match)
+    return fused_matches
+
+
+def hybrid_matches(
+    query: str,
+    top_k: int = 20,
+    filter_doc_id: Optional[str] = None,
+    query_embedding: Optional[list[float]] = None,
+    include_values: bool = False
+) -> list[dict]:
+    """Dense matches fused with BM25 hits (dense only when hybrid is off)."""
+    from .vector_store import query_similar
+    
+    dense = query_similar(
+        query=query,
+        top_k=top_k,
+        filter_doc_id=filter_doc_id,
+        query_embedding=query_embedding,
+        include_values=include_values
+    )
+    return fuse_matches(dense, lexical_search(query, top_k, filter_doc_id), top_k)
+
+
+# Vector metadata fields that are not user metadata
+CORE_FIELDS = {
+    "text", "doc_id", "chunk_index", "total_chunks",
+    "char_start", "char_end", "token_count", "created_at"
+}
+
+
+def _hydrate_texts(matches: list[dict]) -> dict[str, str]:
+    """
+    Bulk-load chunk text for matches whose metadata doesn't carry it.
+    
+    Looked up regardless of CHUNK_TEXT_STORE, so vectors written while
+    the local store was on stay readable after switching back.
+    """
+    from .text_store import get_text_store
+    
+    missing = [m["id"] for m in matches if "text" not in m["metadata"]]
+    if not missing:
+        return {}
+    return get_text_store().get_many(missing)
+
+
+def chunks_from_matches(matches: list[dict], min_score: float = 0.0) -> list[RetrievedChunk]:
+    """
+    Convert vector store matches ({id, score, metadata}) to RetrievedChunks.
+    
+    Text comes from metadata["text"], or from the chunk text store in one
+    lookup for vectors written with CHUNK_TEXT_STORE=local. Matches whose
+    text is in neither (e.g. the store was lost with an ephemeral disk)
+    are skipped with a warning rather than sent to the LLM empty.
+    """
+    matches = [m for m in matches if m["score"] >= min_score]
+    texts = _hydrate_texts(matches)
+    
     chunks = []
+    lost = []
     for match in matches:
         meta = match["metadata"]
         score = match["score"]
-        
-        # Apply minimum score filter
-        if score < min_score:
+        text = meta.get("text", texts.get(match["id"]))
+        if text is None:
+            lost.append(match["id"])
             continue
         
         # Extract user metadata (everything not in core fields)
-        core_fields = {
-            "text", "doc_id", "chunk_index", "total_chunks",
-            "char_start", "char_end", "token_count", "created_at"
-        }
         user_metadata = {
             k: v for k, v in meta.items() 
-            if k not in core_fields
+            if k not in CORE_FIELDS
         }
         
         chunk = RetrievedChunk(
             chunk_id=match["id"],
             doc_id=meta.get("doc_id", ""),
-            text=meta.get("text", ""),
+            text=text,
             score=score,
             chunk_index=meta.get("chunk_index", 0),
             total_chunks=meta.get("total_chunks", 1),
             char_start=meta.get("char_start", 0),
             char_end=meta.get("char_end", 0),
-            metadata=user_metadata
+            metadata=user_metadata,
+            embedding=match.get("values"),
+            token_count=int(meta["token_count"]) if meta.get("token_count") is not None else None
         )
         chunks.append(chunk)
     
+    if lost:
+        print(f"⚠️ Chunk text missing for {len(lost)} match(es), skipped "
+              f"(text store lost? re-ingest or set CHUNK_TEXT_STORE=metadata): {lost[:5]}")
     return chunks
 
 
+def fetch_chunks(chunk_ids: list[str]) -> list[RetrievedChunk]:
+    """
+    Load chunks by ID (score 0), e.g. neighbours of a hit.
+    
+    One text store lookup, then one index fetch for whatever it lacks;
+    IDs found in neither are omitted.
+    """
+    if not chunk_ids:
+        return []
+    metadata = _lexical_metadata(chunk_ids)
+    return chunks_from_matches([
+        {"id": cid, "score": 0.0, "metadata": metadata[cid]}
+        for cid in chunk_ids if cid in metadata
+    ])
+
+
 def retrieve_as_context(
     query: str,
     top_k: int = 5,
@@ -0,0 +1,159 @@
+"""
+Semantic query cache: reuse answers for near-duplicate questions.
+
+Why:
+- The exact answer cache misses paraphrases ("what causes climate change"
+  vs "causes of climate change?"). Their query embeddings are nearly
+  identical, so a cosine lookup catches them before retrieval even starts
+
+Design choices:
+- Small in-memory matrix of normalized query embeddings (one matmul per
+  lookup); slots are reused oldest-first once SEMANTIC_CACHE_SIZE is reached
+- A hit needs cosine >= SEMANTIC_CACHE_THRESHOLD *and* the same doc_id
+  filter *and* the same retrieval params (retrieve_k, rerank_k, MMR
+  settings) *and* the same corpus version; a rerank_k=3 answer is not a
+  valid reply to a rerank_k=10 request
+- Corpus version: bumped on every ingest/delete (pipeline.invalidate_document).
+  Entries remember the version their query started under, so an answer
+  computed across an ingest is never served afterwards
+- Threshold is deliberately high: questions differing only in a number or
+  name ("revenue in 2020" vs "2021") can still embed very close together
+
+SEMANTIC_CACHE_SIZE=0 disables the cache.
+"""
+
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import Optional, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .pipeline import RAGResult
+
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL_S = float(os.getenv("SEMANTIC_CACHE_TTL_S", "3600"))
+
+
+class SemanticCache:
+    """Cosine-similarity lookup of cached RAGResults by query embedding."""
+
+    def __init__(
+        self,
+        max_items: int = SEMANTIC_CACHE_SIZE,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = SEMANTIC_CACHE_TTL_S
+    ):
+        self.max_items = max_items
+        self.threshold = threshold
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None     # (max_items, dim), allocated lazily
+        self._entries: list[Optional[tuple]] = [None] * max_items  # (doc_filter, params, version, created, result)
+        self._next = 0
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_items > 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        v = np.asarray(embedding, dtype=np.float32)
+        return v / max(float(np.linalg.norm(v)), 1e-12)
+
+    def bump_version(self) -> None:
+        """Corpus changed: every cached answer is stale."""
+        with self._lock:
+            self.version += 1
+            self._entries = [None] * self.max_items
+            if self._vectors is not None:
+                self._vectors[:] = 0.0
+
+    def get(self, embedding, doc_filter: Optional[str], params: tuple) -> Optional[RAGResult]:
+        """Closest cached result within the threshold computed with the same params, or None."""
+        if not self.enabled:
+            return None
+        query = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            if self._vectors is None:
+                self.misses += 1
+                return None
+            scores = self._vectors @ query
+            for slot in np.argsort(-scores):
+                if scores[slot] < self.threshold:
+                    break
+                entry = self._entries[slot]
+                if entry is None:
+                    continue
+                entry_filter, entry_params, version, created, result = entry
+                if (
+                    entry_filter == doc_filter
+                    and entry_params == params
+                    and version == self.version
+                    and now - created <= self.ttl
+                ):
+                    self.hits += 1
+                    return result
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        embedding,
+        doc_filter: Optional[str],
+        params: tuple,
+        version: int,
+        result: RAGResult
+    ) -> None:
+        """
+        Store a result computed while the corpus was at `version`.
+        
+        params: (retrieve_k, rerank_k, mmr_k, mmr_lambda) the result was
+        computed with; get() only returns it for the same tuple.
+        """
+        if not self.enabled:
+            return
+        query = self._normalize(embedding)
+        with self._lock:
+            if version != self.version:
+                return    # Corpus changed while this query ran
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_items, len(query)), dtype=np.float32)
+            slot = self._next
+            self._vectors[slot] = query
+            self._entries[slot] = (doc_filter, params, version, time.monotonic(), result)
+            self._next = (slot + 1) % self.max_items
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "items": sum(1 for entry in self._entries if entry is not None),
+            "max_items": self.max_items,
+            "threshold": self.threshold,
+            "corpus_version": self.version
+        }
+
+
+_cache: Optional[SemanticCache] = None
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Get or create the semantic cache."""
+    global _cache
+    if _cache is None:
+        _cache = SemanticCache()
+    return _cache
+
+
+def get_semantic_cache_stats() -> dict:
+    return get_semantic_cache().stats()
@@ -0,0 +1,141 @@
+"""
+Chunk text store (SQLite, zlib-compressed).
+
+Why:
+- Keeping full chunk text in vector metadata inflates index storage and
+  every query response (~4KB of text per candidate, 20 candidates/query)
+- With the text here, vector metadata holds only small filterable fields
+  and the retriever hydrates all candidates in one bulk lookup
+- A copy of those small fields is kept too, so lexical (BM25) hits that
+  the vector search didn't return can be built without an index fetch
+
+Schema (chunk_texts):
+- chunk_id (PK), doc_id (indexed, for document deletes), text (zlib BLOB),
+  meta (JSON of the vector metadata, without text)
+
+Modes (CHUNK_TEXT_STORE):
+- "metadata" (default): text stored in vector metadata; safe on hosts
+  with an ephemeral disk (e.g. the Render free plan), where this file
+  would vanish on every restart while the vectors survive
+- "local": opt-in, text lives here, not in vector metadata. Only when
+  DATA_DIR is on a persistent disk
+
+Vectors written before the store existed still carry text in metadata;
+the retriever falls back to it.
+"""
+
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterable, Optional
+
+DATA_DIR = os.getenv("DATA_DIR", "data")
+CHUNK_TEXT_STORE = os.getenv("CHUNK_TEXT_STORE", "metadata").lower()
+TEXT_STORE_PATH = os.getenv("TEXT_STORE_PATH", os.path.join(DATA_DIR, "chunk_texts.sqlite3"))
+
+_SQL_BATCH = 500  # Stay under SQLite's bound-parameter limit
+
+
+def text_store_enabled() -> bool:
+    """True when chunk text is kept in the local store instead of metadata."""
+    return CHUNK_TEXT_STORE == "local"
+
+
+class ChunkTextStore:
+    """SQLite-backed chunk_id → compressed text map."""
+
+    def __init__(self, path: str = TEXT_STORE_PATH):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunk_texts (
+                    chunk_id TEXT PRIMARY KEY,
+                    doc_id   TEXT NOT NULL,
+                    text     BLOB NOT NULL,
+                    meta     TEXT NOT NULL DEFAULT '{}'
+                )
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chunk_texts)")}
+            if "meta" not in columns:
+                self._conn.execute("ALTER TABLE chunk_texts ADD COLUMN meta TEXT NOT NULL DEFAULT '{}'")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_chunk_texts_doc ON chunk_texts (doc_id)"
+            )
+            self._conn.commit()
+
+    def put_many(self, rows: Iterable[tuple[str, str, str, dict]]) -> None:
+        """Insert or replace (chunk_id, doc_id, text, metadata) rows."""
+        packed = [
+            (chunk_id, doc_id, zlib.compress(text.encode("utf-8")), json.dumps(meta))
+            for chunk_id, doc_id, text, meta in rows
+        ]
+        if not packed:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_texts (chunk_id, doc_id, text, meta) "
+                "VALUES (?, ?, ?, ?)",
+                packed
+            )
+            self._conn.commit()
+
+    def _select(self, columns: str, chunk_ids: list[str]) -> list[tuple]:
+        rows: list[tuple] = []
+        with self._lock:
+            for i in range(0, len(chunk_ids), _SQL_BATCH):
+                batch = chunk_ids[i:i + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows.extend(self._conn.execute(
+                    f"SELECT {columns} FROM chunk_texts WHERE chunk_id IN ({placeholders})",
+                    batch
+                ).fetchall())
+        return rows
+
+    def get_many(self, chunk_ids: list[str]) -> dict[str, str]:
+        """Bulk text lookup; missing IDs are omitted."""
+        return {
+            chunk_id: zlib.decompress(blob).decode("utf-8")
+            for chunk_id, blob in self._select("chunk_id, text", chunk_ids)
+        }
+
+    def get_records(self, chunk_ids: list[str]) -> dict[str, dict]:
+        """Bulk lookup of vector-style metadata with "text" filled in."""
+        return {
+            chunk_id: {**json.loads(meta), "text": zlib.decompress(blob).decode("utf-8")}
+            for chunk_id, blob, meta in self._select("chunk_id, text, meta", chunk_ids)
+        }
+
+    def delete_ids(self, chunk_ids: list[str]) -> None:
+        with self._lock:
+            for i in range(0, len(chunk_ids), _SQL_BATCH):
+                batch = chunk_ids[i:i + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(
+                    f"DELETE FROM chunk_texts WHERE chunk_id IN ({placeholders})", batch
+                )
+            self._conn.commit()
+
+    def delete_document(self, doc_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM chunk_texts WHERE doc_id = ?", (doc_id,))
+            self._conn.commit()
+
+
+_store: Optional[ChunkTextStore] = None
+
+
+def get_text_store() -> ChunkTextStore:
+    """Get or create the chunk text store."""
+    global _store
+    if _store is None:
+        _store = ChunkTextStore()
+    return _store
@@ -1,5 +1,5 @@
 """
-Pinecone vector store operations.
+Vector store operations (Pinecone, or a local NumPy index).
 
 Index Configuration:
 - Dimension: 384 (matches all-MiniLM-L6-v2)
@@ -13,34 +13,64 @@ ID Strategy:
 Metadata Strategy:
 - Store all Chunk fields as flat key-value pairs
 - Pinecone metadata supports: str, int, float, bool, list[str]
-- Text stored in metadata for retrieval (Pinecone doesn't return vectors)
+- Chunk text is stored in metadata by default; CHUNK_TEXT_STORE=local
+  moves it to the local text store (text_store.py) to keep metadata small
 
-NOTE: Lazy imports used for embedder to reduce startup memory.
+Document listing:
+- Served from doc_registry (SQLite), not by scanning the index
+- An empty registry over a non-empty index (index predating the
+  registry, or DATA_DIR lost on restart) is backfilled at startup
+  (ensure_registry); python -m app.migrate_registry runs it by hand
+
+Backends (VECTOR_BACKEND):
+- "pinecone" (default): hosted serverless index
+- "local": in-process exact search (local_vector_store.NumpyIndex), same
+  index API, persisted under DATA_DIR; no network hop, works offline
+
+Upserts:
+- Batched by vector count and serialized payload size, sent concurrently
+  over a bounded pool, each batch retried with backoff on 429/5xx/network
+
+NOTE: Lazy imports used for embedder/pinecone to reduce startup memory.
 """
 
 from __future__ import annotations
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, TYPE_CHECKING
 
-from pinecone import Pinecone
-
 if TYPE_CHECKING:
+    from pinecone import Pinecone
     from .chunker import Chunk
 
 
 # Index configuration
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()
 INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "mini-rag")
 EMBEDDING_DIMENSION = 384  # all-MiniLM-L6-v2 dimension
 DIMENSION = EMBEDDING_DIMENSION
 METRIC = "cosine"
 
+# Upsert batching: Pinecone caps requests at 2MB and recommends <=100 vectors.
+# Batches close at whichever limit is hit first (headroom left for framing).
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))
+UPSERT_MAX_BATCH_BYTES = int(os.getenv("UPSERT_MAX_BATCH_BYTES", str(1_800_000)))
+UPSERT_MAX_WORKERS = int(os.getenv("UPSERT_MAX_WORKERS", "4"))
+UPSERT_MAX_RETRIES = int(os.getenv("UPSERT_MAX_RETRIES", "3"))
+UPSERT_RETRY_BASE_DELAY = 0.5  # seconds, doubled per attempt
+
 # Singleton client
 _client: Optional[Pinecone] = None
 _index = None
+_upsert_pool: Optional[ThreadPoolExecutor] = None
 
 
 def get_client() -> Pinecone:
     """Get or create Pinecone client."""
+    from pinecone import Pinecone
+    
     global _client
     if _client is None:
         api_key = os.getenv("PINECONE_API_KEY")
@@ -51,8 +81,11 @@ def get_client() -> Pinecone:
 
 
 def get_index():
-    """Get or create the Pinecone index."""
+    """Get or create the index for the configured backend."""
     global _index
+    if _index is None and VECTOR_BACKEND == "local":
+        from .local_vector_store import NumpyIndex
+        _index = NumpyIndex(dimension=DIMENSION)
     if _index is None:
         client = get_client()
         
@@ -75,28 +108,17 @@ def get_index():
     return _index
 
 
-def upsert_chunks(chunks: list) -> dict:
+def build_vectors(chunks: list, embeddings: list[list[float]]) -> list[dict]:
     """
-    Embed and upsert chunks to Pinecone.
+    Pair chunks with their embeddings as {id, values, metadata} upsert dicts.
     
-    Args:
-        chunks: List of Chunk objects from chunker
-        
-    Returns:
-        {"upserted_count": int, "doc_id": str}
+    Everything derived from chunk text is written here, before the vectors
+    become searchable: the local text store (text is then left out of
+    metadata) and the BM25 index for hybrid search.
     """
-    from .embedder import embed_texts  # Lazy import
-    
-    if not chunks:
-        return {"upserted_count": 0, "doc_id": None}
+    from .text_store import get_text_store, text_store_enabled
+    from .retriever import HYBRID_SEARCH
     
-    index = get_index()
-    
-    # Batch embed all chunk texts
-    texts = [chunk.text for chunk in chunks]
-    embeddings = embed_texts(texts)
-    
-    # Prepare vectors for upsert
     vectors = []
     for chunk, embedding in zip(chunks, embeddings):
         vectors.append({
@@ -104,7 +126,6 @@ def upsert_chunks(chunks: list) -> dict:
             "values": embedding,
             "metadata": {
                 # Core fields for retrieval
-                "text": chunk.text,
                 "doc_id": chunk.doc_id,
                 "chunk_index": chunk.index,
                 "total_chunks": chunk.total_chunks,
@@ -119,17 +140,152 @@ def upsert_chunks(chunks: list) -> dict:
             }
         })
     
-    # Upsert in batches of 100 (Pinecone limit)
-    batch_size = 100
-    total_upserted = 0
+    if text_store_enabled():
+        get_text_store().put_many(
+            (chunk.chunk_id, chunk.doc_id, chunk.text, vector["metadata"])
+            for chunk, vector in zip(chunks, vectors)
+        )
+    else:
+        for chunk, vector in zip(chunks, vectors):
+            vector["metadata"]["text"] = chunk.text
+    
+    if HYBRID_SEARCH:
+        from .bm25_index import get_bm25_index
+        get_bm25_index().add_many(
+            (chunk.chunk_id, chunk.doc_id, chunk.text) for chunk in chunks
+        )
+    
+    return vectors
+
+
+def _payload_batches(vectors: list[dict]) -> list[list[dict]]:
+    """
+    Split vectors into requests bounded by count and serialized size.
+    
+    Chunk text rides in metadata, so 100 vectors can be anywhere from
+    ~1MB to well past Pinecone's request limit; size each vector as JSON
+    and close a batch before it would overflow.
+    """
+    batches: list[list[dict]] = []
+    batch: list[dict] = []
+    batch_bytes = 0
+    for vector in vectors:
+        size = len(json.dumps(vector, separators=(",", ":")).encode("utf-8"))
+        if batch and (len(batch) >= UPSERT_BATCH_SIZE or batch_bytes + size > UPSERT_MAX_BATCH_BYTES):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(vector)
+        batch_bytes += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+_network_errors: Optional[tuple] = None
+
+
+def _get_network_errors() -> tuple:
+    """
+    Connection/timeout exception types of whichever HTTP stack the installed
+    Pinecone client uses (urllib3 up to v7, httpx after; requests via
+    plugins). None of them subclass the builtin ConnectionError.
+    """
+    global _network_errors
+    if _network_errors is None:
+        errors: list[type] = [OSError]   # Builtin Connection/TimeoutError, requests' errors
+        try:
+            import urllib3.exceptions
+            errors += [
+                urllib3.exceptions.MaxRetryError,
+                urllib3.exceptions.ProtocolError,
+                urllib3.exceptions.TimeoutError,
+                urllib3.exceptions.NewConnectionError
+            ]
+        except ImportError:
+            pass
+        try:
+            import requests.exceptions
+            errors += [requests.exceptions.ConnectionError, requests.exceptions.Timeout]
+        except ImportError:
+            pass
+        try:
+            import httpx
+            errors += [httpx.TransportError]
+        except ImportError:
+            pass
+        _network_errors = tuple(errors)
+    return _network_errors
+
+
+def _is_transient(error: Exception) -> bool:
+    """Rate limits, server errors and network failures are worth retrying."""
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return isinstance(error, _get_network_errors())
+
+
+def _upsert_batch(batch: list[dict]) -> int:
+    """One upsert request, retried with exponential backoff on transient errors."""
+    index = get_index()
+    for attempt in range(UPSERT_MAX_RETRIES + 1):
+        try:
+            return index.upsert(vectors=batch).upserted_count
+        except Exception as e:
+            if attempt == UPSERT_MAX_RETRIES or not _is_transient(e):
+                raise
+            delay = UPSERT_RETRY_BASE_DELAY * (2 ** attempt)
+            print(f"⚠️ Upsert of {len(batch)} vectors failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+    return 0
+
+
+def _get_upsert_pool() -> ThreadPoolExecutor:
+    global _upsert_pool
+    if _upsert_pool is None:
+        _upsert_pool = ThreadPoolExecutor(
+            max_workers=UPSERT_MAX_WORKERS, thread_name_prefix="upsert"
+        )
+    return _upsert_pool
+
+
+def upsert_vectors(vectors: list[dict]) -> int:
+    """
+    Upsert prepared vectors. Returns the number upserted.
+    
+    Batches are sized by vector count and payload bytes, then sent
+    concurrently over a bounded pool; each batch retries on its own.
+    """
+    if not vectors:
+        return 0
+    
+    batches = _payload_batches(vectors)
+    if len(batches) == 1:
+        return _upsert_batch(batches[0])
+    return sum(_get_upsert_pool().map(_upsert_batch, batches))
+
+
+def upsert_chunks(chunks: list) -> dict:
+    """
+    Embed and upsert chunks to Pinecone.
+    
+    Args:
+        chunks: List of Chunk objects from chunker
+        
+    Returns:
+        {"upserted_count": int, "doc_id": str}
+    """
+    from .embedder import embed_texts  # Lazy import
+    
+    if not chunks:
+        return {"upserted_count": 0, "doc_id": None}
     
-    for i in range(0, len(vectors), batch_size):
-        batch = vectors[i:i + batch_size]
-        result = index.upsert(vectors=batch)
-        total_upserted += result.upserted_count
+    # Batch embed all chunk texts
+    texts = [chunk.text for chunk in chunks]
+    embeddings = embed_texts(texts)
     
     return {
-        "upserted_count": total_upserted,
+        "upserted_count": upsert_vectors(build_vectors(chunks, embeddings)),
         "doc_id": chunks[0].doc_id
     }
 
@@ -137,7 +293,9 @@ def upsert_chunks(chunks: list) -> dict:
 def query_similar(
     query: str,
     top_k: int = 20,
-    filter_doc_id: Optional[str] = None
+    filter_doc_id: Optional[str] = None,
+    query_embedding: Optional[list[float]] = None,
+    include_values: bool = False
 ) -> list[dict]:
     """
     Query for similar chunks.
@@ -146,16 +304,19 @@ def query_similar(
         query: Search query text
         top_k: Number of results to return
         filter_doc_id: Optional doc_id to filter results
+        query_embedding: Precomputed query vector (skips embedding)
+        include_values: Also return each match's embedding (for MMR)
         
     Returns:
-        List of {id, score, metadata} dicts
+        List of {id, score, metadata} dicts (+ "values" if include_values)
     """
     from .embedder import embed_query  # Use query-specific embedding
     
     index = get_index()
     
     # Embed query (uses search_query input_type for better results)
-    query_embedding = embed_query(query)
+    if query_embedding is None:
+        query_embedding = embed_query(query)
     
     # Build filter
     filter_dict = None
@@ -167,70 +328,164 @@ def query_similar(
         vector=query_embedding,
         top_k=top_k,
         include_metadata=True,
+        include_values=include_values,
         filter=filter_dict
     )
     
-    return [
-        {
+    matches = []
+    for match in results.matches:
+        result = {
             "id": match.id,
             "score": match.score,
             "metadata": match.metadata
         }
-        for match in results.matches
-    ]
+        if include_values:
+            result["values"] = list(match.values)
+        matches.append(result)
+    return matches
+
+
+def flush_index() -> None:
+    """Persist the local index (no-op for Pinecone, which writes through)."""
+    if VECTOR_BACKEND == "local":
+        get_index().flush()
 
 
 def delete_document(doc_id: str) -> dict:
     """
-    Delete all chunks for a document.
+    Delete all chunks for a document and its registry entry.
     
     Uses prefix-based deletion: all IDs starting with "{doc_id}_chunk_"
     """
+    from .bm25_index import get_bm25_index
+    from .doc_registry import get_registry
+    from .text_store import get_text_store
+    
     index = get_index()
     
     # Pinecone serverless uses filter-based deletion
     index.delete(filter={"doc_id": {"$eq": doc_id}})
+    flush_index()
+    get_text_store().delete_document(doc_id)
+    bm25 = get_bm25_index()
+    bm25.delete_document(doc_id)
+    bm25.flush()
+    get_registry().remove(doc_id)
     
     return {"deleted_doc_id": doc_id, "status": "success"}
 
 
-def list_documents() -> list[dict]:
+def delete_chunks(chunk_ids: list[str]) -> None:
+    """Delete specific chunk vectors by ID (e.g. leftovers after re-ingest)."""
+    from .bm25_index import get_bm25_index
+    from .text_store import get_text_store
+    
+    index = get_index()
+    for i in range(0, len(chunk_ids), 1000):  # Pinecone delete-by-id limit
+        index.delete(ids=chunk_ids[i:i + 1000])
+    flush_index()
+    get_text_store().delete_ids(chunk_ids)
+    get_bm25_index().delete_ids(chunk_ids)
+
+
+def _chunk_number(chunk_id: str) -> int:
+    suffix = chunk_id.rsplit("_chunk_", 1)[-1]
+    return int(suffix) if suffix.isdigit() else 0
+
+
+def backfill_registry(doc_ids: Optional[list[str]] = None) -> int:
     """
-    List all unique document IDs in the index.
+    One-off migration: register documents that are in the index but not in
+    the registry (ingested before the registry existed, or after its local
+    file was lost). Run it explicitly: python -m app.migrate_registry
+    
+    Chunk IDs come from the index's ID listing (index.list, paginated;
+    prefix "{doc_id}_chunk_" when doc_ids are given), so each row records
+    the document's real chunk IDs; title and created_at come from one
+    fetched chunk per document. byte_size is unknown and left at 0.
+    Documents already registered are left untouched.
     
-    Note: Pinecone doesn't support DISTINCT queries, so we sample
-    and deduplicate. For production, maintain a separate doc registry.
+    Returns:
+        Number of documents registered
     """
+    from .doc_registry import get_registry
+    
     index = get_index()
+    registry = get_registry()
     
-    # Get index stats
-    stats = index.describe_index_stats()
-    total_vectors = stats.total_vector_count
+    # doc_id → chunk IDs, from "{doc_id}_chunk_{index:04d}" vector IDs
+    found: dict[str, list[str]] = {}
+    prefixes = [f"{doc_id}_chunk_" for doc_id in doc_ids] if doc_ids else [None]
+    for prefix in prefixes:
+        pages = index.list(prefix=prefix) if prefix else index.list()
+        for page in pages:
+            for chunk_id in page:
+                doc_id, sep, _ = chunk_id.rpartition("_chunk_")
+                if sep:
+                    found.setdefault(doc_id, []).append(chunk_id)
     
-    if total_vectors == 0:
-        return []
+    missing = {d: ids for d, ids in found.items() if registry.get(d) is None}
+    firsts = {d: min(ids, key=_chunk_number) for d, ids in missing.items()}
+    first_ids = list(firsts.values())
+    fetched = {}
+    for i in range(0, len(first_ids), 100):   # Keep fetch URLs short
+        fetched.update(index.fetch(ids=first_ids[i:i + 100]).vectors)
     
-    # Sample vectors to find unique doc_ids
-    # This is a workaround - production should use a metadata store
-    results = index.query(
-        vector=[0.0] * DIMENSION,  # Dummy vector
-        top_k=min(1000, total_vectors),
-        include_metadata=True
-    )
+    for doc_id, chunk_ids in missing.items():
+        vector = fetched.get(firsts[doc_id])
+        metadata = dict(vector.metadata or {}) if vector is not None else {}
+        registry.upsert(
+            doc_id=doc_id,
+            title=metadata.get("title", "Untitled"),
+            chunk_ids=sorted(chunk_ids, key=_chunk_number),
+            created_at=metadata.get("created_at") or "",
+            byte_size=0
+        )
+    print(f"✅ Document registry backfilled with {len(missing)} documents")
+    return len(missing)
+
+
+def ensure_registry() -> None:
+    """
+    Startup hook: backfill an empty registry from a non-empty index.
     
-    # Deduplicate by doc_id
-    docs = {}
-    for match in results.matches:
-        doc_id = match.metadata.get("doc_id")
-        if doc_id and doc_id not in docs:
-            docs[doc_id] = {
-                "doc_id": doc_id,
-                "title": match.metadata.get("title", "Untitled"),
-                "created_at": match.metadata.get("created_at"),
-                "total_chunks": match.metadata.get("total_chunks", 0)
-            }
+    The registry lives under DATA_DIR, which is ephemeral on Render's free
+    tier; after a restart the vectors survive in Pinecone but the registry
+    (and with it /documents and stale-chunk cleanup) would be empty.
+    """
+    from .doc_registry import get_registry
+    
+    if get_registry().count() > 0:
+        return
+    if get_index().describe_index_stats().total_vector_count == 0:
+        return
+    print("⚠️ Document registry is empty but the vector index is not; backfilling")
+    backfill_registry()
+
+
+def list_documents(limit: int = 50, cursor: Optional[str] = None) -> list[dict]:
+    """
+    List documents from the registry, newest first.
+    
+    See list_documents_page for the next-page cursor.
+    """
+    docs, _ = list_documents_page(limit, cursor)
+    return docs
+
+
+def list_documents_page(
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> tuple[list[dict], Optional[str]]:
+    """
+    One page of documents from the registry: O(page) indexed read.
+    
+    Returns:
+        (documents, next_cursor) — next_cursor is None on the last page
+    """
+    from .doc_registry import get_registry
     
-    return list(docs.values())
+    return get_registry().list_page(limit=limit, cursor=cursor)
 
 
 def get_index_stats() -> dict:
@@ -240,5 +495,6 @@ def get_index_stats() -> dict:
     return {
         "total_vectors": stats.total_vector_count,
         "dimension": DIMENSION,
-        "index_name": INDEX_NAME
+        "index_name": INDEX_NAME,
+        "backend": VECTOR_BACKEND
     }
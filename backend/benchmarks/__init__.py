@@ -0,0 +1,2 @@
+# Benchmarks module
+# Run from backend/: python -m benchmarks.<name>
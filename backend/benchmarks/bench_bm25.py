@@ -0,0 +1,83 @@
+"""
+BM25 index size and lexical lookup latency benchmark.
+
+Indexes a synthetic corpus of chunk-sized texts (Zipf-distributed words
+plus sprinkled identifiers like error codes), then reports indexing
+throughput, compressed postings size and query latency for identifier
+lookups and multi-word queries.
+
+Usage (from backend/):
+    python -m benchmarks.bench_bm25
+    python -m benchmarks.bench_bm25 --chunks 100000 --words 200
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.services.bm25_index import BM25Index
+
+
+def make_corpus(chunks: int, words: int, vocab: int, seed: int = 7) -> list[str]:
+    """Zipf-like word frequencies; every ~50th chunk mentions an error code."""
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(vocab)]
+    vocabulary = [f"term{i}" for i in range(vocab)]
+    texts = []
+    for i in range(chunks):
+        tokens = rng.choices(vocabulary, weights=weights, k=words)
+        if i % 50 == 0:
+            tokens.append(f"ERR_{i // 50:05d}")
+        texts.append(" ".join(tokens))
+    return texts
+
+
+def timed(index: BM25Index, queries: list[str], k: int) -> tuple[float, float]:
+    """(mean ms, p95 ms) over the queries."""
+    times = []
+    for query in queries:
+        t0 = time.perf_counter()
+        index.search(query, top_k=k)
+        times.append((time.perf_counter() - t0) * 1000)
+    return float(np.mean(times)), float(np.percentile(times, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--words", type=int, default=150)
+    parser.add_argument("--vocab", type=int, default=30000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+
+    texts = make_corpus(args.chunks, args.words, args.vocab)
+    raw_bytes = sum(len(t) for t in texts)
+
+    index = BM25Index(path=None)
+    t0 = time.perf_counter()
+    for start in range(0, len(texts), 96):
+        index.add_many(
+            (f"doc_chunk_{i:06d}", "doc", texts[i])
+            for i in range(start, min(start + 96, len(texts)))
+        )
+    build = time.perf_counter() - t0
+    print(f"{args.chunks:,} chunks x {args.words} words | indexed in {build:.1f}s "
+          f"({args.chunks / build:,.0f} chunks/s)")
+    print(f"postings {index.size_bytes / 1e6:.1f}MB compressed "
+          f"({index.size_bytes / raw_bytes:.0%} of raw text, {len(index._postings):,} terms)")
+
+    rng = random.Random(11)
+    identifier = [f"what does ERR_{rng.randrange(args.chunks // 50):05d} mean" for _ in range(args.queries)]
+    rare = [" ".join(f"term{rng.randrange(1000, args.vocab)}" for _ in range(4)) for _ in range(args.queries)]
+    common = [" ".join(f"term{rng.randrange(0, 50)}" for _ in range(4)) for _ in range(args.queries)]
+
+    for name, queries in (("identifier", identifier), ("rare words", rare), ("common words", common)):
+        mean, p95 = timed(index, queries, args.k)
+        print(f"{name:>14s}  {mean:7.3f}ms mean  {p95:7.3f}ms p95")
+
+
+if __name__ == "__main__":
+    main()
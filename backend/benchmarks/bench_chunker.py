@@ -0,0 +1,97 @@
+"""
+Chunker throughput benchmark.
+
+Compares the single-pass TokenOffsetSplitter against the previous
+LangChain RecursiveCharacterTextSplitter with a tiktoken length function
+(which re-encodes every candidate split and merge).
+
+Usage (from backend/):
+    python -m benchmarks.bench_chunker
+    python -m benchmarks.bench_chunker --paragraphs 2000 --repeat 3
+"""
+
+import argparse
+import random
+import time
+
+import tiktoken
+
+from app.services.chunker import SEPARATORS, TokenOffsetSplitter
+
+WORDS = (
+    "climate energy model system data carbon ocean policy network signal "
+    "retrieval vector index token response temperature emission research "
+    "analysis report figure table section result method baseline"
+).split()
+
+
+def make_document(paragraphs: int, seed: int = 7) -> str:
+    """Build a synthetic PDF-like document of sentences and paragraphs."""
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(paragraphs):
+        sentences = []
+        for _ in range(rng.randint(3, 8)):
+            words = rng.choices(WORDS, k=rng.randint(8, 24))
+            sentences.append(" ".join(words).capitalize() + rng.choice([".", "?", "!", ";"]))
+        parts.append(" ".join(sentences))
+    return "\n\n".join(parts)
+
+
+def legacy_split(encoding: tiktoken.Encoding, chunk_size: int, chunk_overlap: int):
+    """The pre-existing splitter configuration."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=lambda t: len(encoding.encode(t)),
+        separators=SEPARATORS + [""],
+        keep_separator=True
+    )
+    return splitter.split_text
+
+
+def time_it(fn, text: str, repeat: int) -> tuple[float, int]:
+    """Best-of-N wall time and number of chunks produced."""
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        count = len(fn(text))
+        best = min(best, time.perf_counter() - t0)
+    return best, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--paragraphs", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=120)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    encoding = tiktoken.get_encoding("cl100k_base")
+    text = make_document(args.paragraphs)
+    n_tokens = len(encoding.encode(text))
+    mb = len(text.encode("utf-8")) / 1024 / 1024
+    print(f"Document: {len(text):,} chars, {n_tokens:,} tokens ({mb:.2f}MB)")
+
+    splitter = TokenOffsetSplitter(encoding, args.chunk_size, args.chunk_overlap)
+    runs = [
+        ("langchain (re-encoding)", legacy_split(encoding, args.chunk_size, args.chunk_overlap)),
+        ("token-offset (single pass)", splitter.split),
+    ]
+
+    results = []
+    for name, fn in runs:
+        seconds, count = time_it(fn, text, args.repeat)
+        results.append(seconds)
+        print(f"{name:28s} {seconds * 1000:9.1f}ms  {count:5d} chunks  "
+              f"{n_tokens / seconds / 1000:8.1f}K tokens/s")
+
+    print(f"Speedup: {results[0] / results[1]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
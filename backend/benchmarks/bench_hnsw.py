@@ -0,0 +1,75 @@
+"""
+HNSW recall vs latency benchmark against exact search.
+
+Builds an HNSWIndex and an exact NumpyIndex over the same (clustered,
+embedding-like) vectors, then reports recall@k and mean query latency for
+a sweep of ef_search values.
+
+Usage (from backend/):
+    python -m benchmarks.bench_hnsw
+    python -m benchmarks.bench_hnsw --n 20000 --M 16 --ef-construction 100
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.services.hnsw import HNSWIndex
+from app.services.local_vector_store import NumpyIndex
+
+
+def make_vectors(n: int, dim: int, clusters: int, seed: int = 7) -> np.ndarray:
+    """Gaussian clusters: closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, n)
+    return centers[labels] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--M", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=100)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[10, 20, 40, 80, 160])
+    args = parser.parse_args()
+
+    data = make_vectors(args.n + args.queries, args.dim, clusters=max(args.n // 100, 8))
+    vectors, queries = data[:args.n], data[args.n:]
+    ids = [f"v{i}" for i in range(args.n)]
+
+    exact = NumpyIndex(args.dim, path=None, index_type="exact")
+    exact.upsert([{"id": vid, "values": vec, "metadata": {}} for vid, vec in zip(ids, vectors)])
+
+    hnsw = HNSWIndex(args.dim, M=args.M, ef_construction=args.ef_construction)
+    t0 = time.perf_counter()
+    for vid, vec in zip(ids, vectors):
+        hnsw.add(vid, vec)
+    build = time.perf_counter() - t0
+    print(f"{args.n:,} x {args.dim} vectors | HNSW build {build:.1f}s "
+          f"({build / args.n * 1000:.2f}ms/insert, M={args.M}, ef_construction={args.ef_construction})")
+
+    truth = []
+    t0 = time.perf_counter()
+    for q in queries:
+        truth.append({m.id for m in exact.query(q, top_k=args.k).matches})
+    exact_ms = (time.perf_counter() - t0) / len(queries) * 1000
+    print(f"{'exact':>14s}  recall@{args.k}=1.000  {exact_ms:7.3f}ms/query")
+
+    for ef in args.ef_search:
+        hits = 0
+        t0 = time.perf_counter()
+        results = [hnsw.search(q, k=args.k, ef=ef) for q in queries]
+        ms = (time.perf_counter() - t0) / len(queries) * 1000
+        for found, expected in zip(results, truth):
+            hits += len({label for label, _ in found} & expected)
+        recall = hits / (len(queries) * args.k)
+        print(f"{'ef_search=' + str(ef):>14s}  recall@{args.k}={recall:.3f}  {ms:7.3f}ms/query")
+
+
+if __name__ == "__main__":
+    main()